@@ -1,6 +1,9 @@
 #!/usr/bin/env uv run
 # /// script
-# dependencies = []
+# dependencies = [
+#   "orjson>=3.9.0",
+#   "xxhash>=3.0.0"
+# ]
 # ///
 """
 PostToolUse Hook - Track file changes for Tig
@@ -8,31 +11,169 @@ PostToolUse Hook - Track file changes for Tig
 import json
 import sys
 import os
-import hashlib
 from datetime import datetime
 
-def get_file_hash(file_path):
-    """Get SHA-256 hash of file content"""
+# orjson serializes several times faster than the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Files at or above this size are mapped instead of read into the heap
+MMAP_THRESHOLD = 1 << 20
+CHUNK_SIZE = 1 << 20
+
+# Changes to files over this size (or with these suffixes) are recorded without content
+try:
+    MAX_TRACK_BYTES = int(os.environ.get('TIG_MAX_TRACK_BYTES', 5 << 20))
+except ValueError:
+    MAX_TRACK_BYTES = 5 << 20
+UNTRACKED_SUFFIXES = ('.pack', '.bin', '.pt', '.safetensors', '.mp4')
+
+# Tool input fields that carry file bodies; the stored blob already holds the content
+BULKY_INPUT_KEYS = ('content', 'old_string', 'new_string', 'edits')
+
+# Directories already created this session (seeded from session_state['tracked_dirs'])
+_ensured_dirs = set()
+
+def dump_json(obj, indent=True):
+    """Serialize to JSON bytes (indented unless a compact line is wanted), using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def load_json(path):
+    """Parse a JSON file in one read, using orjson when available"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def atomic_write_json(path, obj):
+    """Write JSON to a temp file and rename it over path, so readers never see a torn file"""
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(dump_json(obj))
+    os.replace(tmp_path, path)
+
+def new_hasher():
+    """Fast non-cryptographic fingerprint; BLAKE2b (still faster than SHA-256) without xxhash"""
+    # Imported here so early-exit runs never pay for hashing modules
     try:
-        with open(file_path, 'rb') as f:
-            return hashlib.sha256(f.read()).hexdigest()
-    except:
-        return None
+        from xxhash import xxh3_128
+        return xxh3_128()
+    except ImportError:
+        import hashlib
+        return hashlib.blake2b(digest_size=16)
+
+def ensure_dir(dir_path):
+    """Create dir_path once per session; later events skip the mkdir syscalls"""
+    if dir_path in _ensured_dirs:
+        return
+    os.makedirs(dir_path, exist_ok=True)
+    _ensured_dirs.add(dir_path)
+
+def write_in_dir(dir_path, write):
+    """Run write() into dir_path; if a cached dir was removed since (branch switch,
+    submodule update, git clean), create it again and retry once"""
+    try:
+        write()
+    except FileNotFoundError:
+        if os.path.isdir(dir_path):
+            raise  # Something else is missing
+        _ensured_dirs.discard(dir_path)
+        ensure_dir(dir_path)
+        write()
+
+def get_file_hash(f):
+    """Hash an open binary file without holding its whole content in memory"""
+    h = new_hasher()
+    if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+        import mmap
+        try:
+            # Hash straight from the page cache, no heap copy
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+            return h.hexdigest()
+        except (OSError, ValueError):
+            pass  # Not mappable (or truncated since fstat), stream it
+    
+    # Bounded working set: one chunk in flight at a time
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        h.update(chunk)
+    return h.hexdigest()
+
+def clone_file(src_path, dst_path):
+    """Copy file data inside the kernel (a reflink on filesystems that support it)"""
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            return
+        except OSError:
+            pass  # e.g. cross-filesystem on older kernels
+    import shutil
+    shutil.copyfile(src_path, dst_path)
 
-def get_file_content(file_path):
-    """Get file content safely"""
+def store_object(tig_dir, file_path):
+    """Store file content once under .tig/objects/<hash[:2]>/<hash[2:]>; return (hash, object path)"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except:
-        return None
+        with open(file_path, 'rb') as f:
+            file_hash = get_file_hash(f)
+    except OSError:
+        return None, None
+    
+    objects_dir = os.path.join(tig_dir, 'objects')
+    obj_path = os.path.join(objects_dir, file_hash[:2], file_hash[2:])
+    if os.path.exists(obj_path):
+        return file_hash, obj_path  # Same content already stored
+    
+    obj_dir = os.path.dirname(obj_path)
+    ensure_dir(obj_dir)
+    # The store ignores itself, so .tig trees set up before it existed never commit it either
+    store_gitignore = os.path.join(objects_dir, '.gitignore')
+    if not os.path.exists(store_gitignore):
+        with open(store_gitignore, 'w') as f:
+            f.write('*\n')
+    tmp_path = os.path.join(objects_dir, f'.tmp-{os.getpid()}')
+    def write_object():
+        clone_file(file_path, tmp_path)
+        os.replace(tmp_path, obj_path)
+    try:
+        write_in_dir(obj_dir, write_object)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return file_hash, None
+    return file_hash, obj_path
+
+def link_working_copy(obj_path, tig_file_path):
+    """Point .tig/<rel_path> at a stored object, hardlinking instead of copying"""
+    if os.path.exists(tig_file_path) and os.path.samefile(obj_path, tig_file_path):
+        return
+    tig_file_dir = os.path.dirname(tig_file_path)
+    ensure_dir(tig_file_dir)
+    tmp_path = f'{tig_file_path}.tmp-{os.getpid()}'
+    def write_link():
+        try:
+            os.link(obj_path, tmp_path)
+        except OSError:
+            import shutil
+            shutil.copyfile(obj_path, tmp_path)
+        os.replace(tmp_path, tig_file_path)
+    write_in_dir(tig_file_dir, write_link)
 
 def main():
     try:
         input_data = json.load(sys.stdin)
         tool_name = input_data['tool_name']
         tool_input = input_data['tool_input']
-        tool_response = input_data['tool_response']
         
         # Only track file-modifying tools
         if tool_name not in ['Write', 'Edit', 'MultiEdit']:
@@ -41,14 +182,12 @@ def main():
         tig_dir = os.path.join(os.getcwd(), '.tig')
         session_state_path = os.path.join(tig_dir, 'session_state.json')
         
-        # Skip if no session state
-        if not os.path.exists(session_state_path):
+        # Load session state; skip if missing (no separate exists() stat)
+        try:
+            session_state = load_json(session_state_path)
+        except FileNotFoundError:
             sys.exit(0)
         
-        # Load session state
-        with open(session_state_path, 'r') as f:
-            session_state = json.load(f)
-        
         if session_state['current_conversation'] is None:
             sys.exit(0)
         
@@ -60,38 +199,48 @@ def main():
         # Make path relative to project root
         rel_path = os.path.relpath(file_path, os.getcwd())
         
-        # Get file content for Tig storage
-        file_content = get_file_content(file_path)
-        file_hash = get_file_hash(file_path)
+        # Skip unchanged files: same mtime and size as the last snapshot
+        try:
+            st = os.stat(file_path)
+            stat_key = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            stat_key = None
+        tracked_files = session_state.setdefault('tracked_files', {})
+        cached = tracked_files.get(rel_path)
+        if stat_key and cached and cached[:2] == stat_key:
+            sys.exit(0)
+        _ensured_dirs.update(session_state.get('tracked_dirs', ()))
+        
+        # Store content once by hash, then expose it at .tig/<rel_path> for Git tracking
+        if (stat_key and stat_key[1] > MAX_TRACK_BYTES) or rel_path.lower().endswith(UNTRACKED_SUFFIXES):
+            file_hash, obj_path = None, None  # Large/binary: record the change only
+        else:
+            file_hash, obj_path = store_object(tig_dir, file_path)
+            if obj_path is not None:
+                link_working_copy(obj_path, os.path.join(tig_dir, rel_path))
+        now = datetime.now().isoformat()
         
         # Record file change
         change_record = {
+            'conversation_id': session_state['current_conversation']['id'],
             'tool_name': tool_name,
             'file_path': rel_path,
             'file_hash': file_hash,
-            'content': file_content,
-            'timestamp': datetime.now().isoformat(),
-            'tool_input': tool_input,
-            'tool_response': tool_response
+            'tig_blob': os.path.relpath(obj_path, tig_dir) if obj_path else None,
+            'timestamp': now,
+            'tool_input': {key: value for key, value in tool_input.items() if key not in BULKY_INPUT_KEYS}
         }
         
-        # Add to current conversation
-        conv = session_state['current_conversation']
-        if rel_path not in conv['file_changes']:
-            conv['file_changes'][rel_path] = []
-        conv['file_changes'][rel_path].append(change_record)
-        
-        # Copy file to .tig directory for Git tracking
-        tig_file_path = os.path.join(tig_dir, rel_path)
-        os.makedirs(os.path.dirname(tig_file_path), exist_ok=True)
-        
-        if file_content is not None:
-            with open(tig_file_path, 'w', encoding='utf-8') as f:
-                f.write(file_content)
+        # Append to the events log instead of rewriting the whole session state
+        events_path = os.path.join(tig_dir, 'events.jsonl')
+        with open(events_path, 'ab') as f:
+            f.write(dump_json(change_record, indent=False) + b'\n')
         
-        # Save updated state
-        with open(session_state_path, 'w') as f:
-            json.dump(session_state, f, indent=2)
+        # Save updated stat cache (session state only holds small metadata)
+        if stat_key and file_hash is not None:
+            tracked_files[rel_path] = stat_key + [file_hash]
+            session_state['tracked_dirs'] = sorted(_ensured_dirs)
+            atomic_write_json(session_state_path, session_state)
             
     except Exception as e:
         # Fail silently
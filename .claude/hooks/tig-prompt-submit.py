@@ -1,6 +1,8 @@
 #!/usr/bin/env uv run
 # /// script
-# dependencies = []
+# dependencies = [
+#   "orjson>=3.9.0"
+# ]
 # ///
 """
 UserPromptSubmit Hook - Capture user prompts for Tig
@@ -10,24 +12,50 @@ import sys
 import os
 from datetime import datetime
 
+# orjson serializes several times faster than the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dump_json(obj, indent=True):
+    """Serialize to JSON bytes (indented unless a compact line is wanted), using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def load_json(path):
+    """Parse a JSON file in one read, using orjson when available"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def atomic_write_json(path, obj):
+    """Write JSON to a temp file and rename it over path, so readers never see a torn file"""
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(dump_json(obj))
+    os.replace(tmp_path, path)
+
 def main():
     try:
         input_data = json.load(sys.stdin)
         prompt = input_data['prompt']
         session_id = input_data['session_id']
+        now = datetime.now().isoformat()  # One timestamp per prompt
         
         # Load session state first to get user_id
         tig_dir = os.path.join(os.getcwd(), '.tig')
         session_state_path = os.path.join(tig_dir, 'session_state.json')
         
-        # Skip if no session state (Tig not initialized)
-        if not os.path.exists(session_state_path):
+        # Load session state; skip if Tig is not initialized (no separate exists() stat)
+        try:
+            session_state = load_json(session_state_path)
+        except FileNotFoundError:
             sys.exit(0)
         
-        # Load session state
-        with open(session_state_path, 'r') as f:
-            session_state = json.load(f)
-        
         # Get user identity from session state
         user_id = session_state.get('user_id', 'unknown_user')
         user_email = session_state.get('user_email', 'unknown@example.com')
@@ -37,28 +65,28 @@ def main():
             conv_id = f"conv_{session_state['conversation_counter']:03d}"
             session_state['current_conversation'] = {
                 'id': conv_id,
-                'start_time': datetime.now().isoformat(),
-                'messages': [],
-                'file_changes': {},
+                'start_time': now,
                 'user_prompt': prompt,  # Store the initial prompt
                 'user_id': user_id,
                 'user_email': user_email
             }
             session_state['conversation_counter'] += 1
         
-        # Record the prompt
+        # Record the prompt in the append-only messages log
         message_id = f"msg_{session_state['message_counter']:03d}"
-        session_state['current_conversation']['messages'].append({
+        message = {
             'id': message_id,
+            'conversation_id': session_state['current_conversation']['id'],
             'type': 'user',
             'content': prompt,
-            'timestamp': datetime.now().isoformat()
-        })
+            'timestamp': now
+        }
+        with open(os.path.join(tig_dir, 'messages.jsonl'), 'ab') as f:
+            f.write(dump_json(message, indent=False) + b'\n')
         session_state['message_counter'] += 1
         
-        # Save updated state
-        with open(session_state_path, 'w') as f:
-            json.dump(session_state, f, indent=2)
+        # Save updated state (counters and conversation metadata only)
+        atomic_write_json(session_state_path, session_state)
             
     except Exception as e:
         # Fail silently to not interrupt user experience
@@ -1,6 +1,8 @@
 #!/usr/bin/env uv run
 # /// script
 # dependencies = [
+#   "orjson>=3.9.0",
+#   "pygit2>=1.14.0",
 #   "python-dotenv>=1.0.0"
 # ]
 # ///
@@ -10,27 +12,95 @@ SessionStart Hook - Initialize Tig session and auto-sync contextbase
 import json
 import sys
 import os
-import subprocess
-import shutil
-from datetime import datetime
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# orjson serializes several times faster than the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dump_json(obj, indent=True):
+    """Serialize to JSON bytes (indented unless a compact line is wanted), using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def load_json(path):
+    """Parse a JSON file in one read, using orjson when available"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def atomic_write_json(path, obj):
+    """Write JSON to a temp file and rename it over path, so readers never see a torn file"""
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(dump_json(obj))
+    os.replace(tmp_path, path)
+
+# How long a `claude mcp list` probe result is reused before probing again
+MCP_PROBE_TTL = timedelta(hours=24)
+
+# Per-user cache, outside the (tracked) .tig tree
+TIG_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'tig')
+
+# Resolved .env paths per working directory, so later sessions skip the directory walk
+ENV_PATH_CACHE = os.path.join(TIG_CACHE_DIR, 'env_path.json')
+
+# Last `claude mcp list` result and time per project directory
+MCP_PROBE_CACHE = os.path.join(TIG_CACHE_DIR, 'mcp_probe.json')
+
+def find_tig_env(start_dir):
+    """Find .env in the nearest Tig project root (directory that also has tig_push.py)"""
+    current_dir = start_dir
+    while True:
+        # One getdents pass per directory instead of a stat per candidate file
+        try:
+            with os.scandir(current_dir) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            names = set()
+        if '.env' in names and 'tig_push.py' in names:
+            return os.path.join(current_dir, '.env')
+        
+        parent_dir = os.path.dirname(current_dir)
+        if parent_dir == current_dir:
+            return None
+        current_dir = parent_dir
 
 # Load environment variables from .env files
 def load_tig_env():
     """Load environment variables from .env file in Tig project root"""
     try:
-        from dotenv import load_dotenv
+        cwd = os.getcwd()
+        try:
+            with open(ENV_PATH_CACHE, 'r') as f:
+                env_cache = json.load(f)
+        except (OSError, ValueError):
+            env_cache = {}
         
-        # Find .env in current directory or parent directories
-        current_dir = Path(os.getcwd())
-        for parent in [current_dir] + list(current_dir.parents):
-            env_file = parent / '.env'
-            if env_file.exists():
-                # Check if this looks like a tig project root (has tig_push.py)
-                if (parent / 'tig_push.py').exists():
-                    load_dotenv(env_file)
-                    return True
-        return False
+        env_file = env_cache.get(cwd)
+        if not env_file or not os.path.exists(env_file):
+            # Find .env in current directory or parent directories
+            env_file = find_tig_env(cwd)
+            if env_file is None:
+                return False
+            
+            env_cache[cwd] = env_file
+            try:
+                os.makedirs(os.path.dirname(ENV_PATH_CACHE), exist_ok=True)
+                atomic_write_json(ENV_PATH_CACHE, env_cache)
+            except OSError:
+                pass  # Cache is best effort
+        
+        # Only pay for importing dotenv once there is a .env to load
+        from dotenv import load_dotenv
+        load_dotenv(env_file)
+        return True
     except ImportError:
         return False
 
@@ -43,36 +113,52 @@ class TigSessionManager:
         self.tig_dir = os.path.join(project_dir, '.tig')
         self.config_path = os.path.join(self.tig_dir, 'config.json')
         self.session_state_path = os.path.join(self.tig_dir, 'session_state.json')
+        self.now = datetime.now().isoformat()  # One timestamp per session start
+        self.mcp_probed = False
+        self._tig_submodule = None
         
     # GCS sync functionality removed as part of database-to-git migration
         
+    def _is_tig_submodule(self):
+        """Check if .tig is configured as a submodule (reads .gitmodules once per session)"""
+        if self._tig_submodule is None:
+            gitmodules_path = os.path.join(self.project_dir, '.gitmodules')
+            try:
+                with open(gitmodules_path, 'rb') as f:
+                    self._tig_submodule = b'path = .tig' in f.read()
+            except OSError:
+                self._tig_submodule = False
+        return self._tig_submodule
+        
     def ensure_tig_structure(self):
         """Create .tig directory structure if it doesn't exist (skips if submodule)"""
         # Skip if .tig is a submodule - it manages its own structure
-        gitmodules_path = os.path.join(self.project_dir, '.gitmodules')
-        if os.path.exists(gitmodules_path):
-            with open(gitmodules_path, 'r') as f:
-                if 'path = .tig' in f.read():
-                    print("ℹ️  Skipping .tig structure creation (submodule manages its own structure)")
-                    return
+        if self._is_tig_submodule():
+            print("ℹ️  Skipping .tig structure creation (submodule manages its own structure)")
+            return
         
         # Only create regular .tig structure if no submodule exists
         os.makedirs(self.tig_dir, exist_ok=True)
         os.makedirs(os.path.join(self.tig_dir, 'cache'), exist_ok=True)
         os.makedirs(os.path.join(self.tig_dir, 'shadow'), exist_ok=True)
         
-        # Create .gitignore to exclude session_state.json
+        # Create .gitignore to exclude per-session files and the blob store
         gitignore_path = os.path.join(self.tig_dir, '.gitignore')
         if not os.path.exists(gitignore_path):
             with open(gitignore_path, 'w') as f:
-                f.write('session_state.json\n')
+                f.write('/session_state.json\n/events.jsonl\n/messages.jsonl\n/objects/\n')
         
         # Initialize git repository if it doesn't exist
         git_dir = os.path.join(self.tig_dir, '.git')
         if not os.path.exists(git_dir):
-            if not os.path.exists(git_dir):
-                print("🔧 Initializing new git repository...")
-            subprocess.run(['git', 'init'], cwd=self.tig_dir, check=True)
+            print("🔧 Initializing new git repository...")
+            try:
+                # In-process init, no git fork/exec
+                import pygit2
+                pygit2.init_repository(self.tig_dir, bare=False)
+            except ImportError:
+                import subprocess
+                subprocess.run(['git', 'init'], cwd=self.tig_dir, check=True)
             
     def load_config(self):
         """Load or create Tig configuration"""
@@ -85,25 +171,77 @@ class TigSessionManager:
             'contextbase_id': None,
             'mcp_server_configured': False,
             'last_sync': None,
-            'created_at': datetime.now().isoformat()
+            'created_at': self.now
         }
         
-        with open(self.config_path, 'w') as f:
-            json.dump(config, f, indent=2)
-            
+        self.save_config(config)
         return config
     
+    def save_config(self, config):
+        """Write Tig configuration"""
+        with open(self.config_path, 'wb') as f:
+            f.write(dump_json(config))
+    
     def check_mcp_server(self):
-        """Check if MCP server is available and configured"""
+        """Check if MCP server is available and configured, reusing a recent probe"""
+        probe = self._load_mcp_probes().get(self.project_dir) or {}
+        if self._mcp_probe_is_fresh(probe):
+            return probe.get('configured', False)
+        
         try:
             # Try to call MCP server to get project context
+            import subprocess
             result = subprocess.run([
                 'claude', 'mcp', 'list'
             ], capture_output=True, text=True, timeout=5)
             
-            return 'tig-history' in result.stdout
+            configured = 'tig-history' in result.stdout
         except:
+            configured = False
+        
+        self.mcp_probed = True
+        return configured
+    
+    def _load_mcp_probes(self):
+        """Read the per-project probe cache (empty if missing or unreadable)"""
+        try:
+            probes = load_json(MCP_PROBE_CACHE)
+        except (OSError, ValueError):
+            return {}
+        return probes if isinstance(probes, dict) else {}
+    
+    def _save_mcp_probe(self, configured):
+        """Record a positive probe so later sessions don't fork `claude` again (negatives aren't reused)"""
+        probes = self._load_mcp_probes()
+        if configured:
+            probes[self.project_dir] = {'configured': True, 'checked_at': self.now}
+        elif probes.pop(self.project_dir, None) is None:
+            return
+        try:
+            os.makedirs(TIG_CACHE_DIR, exist_ok=True)
+            atomic_write_json(MCP_PROBE_CACHE, probes)
+        except OSError:
+            pass  # Cache is best effort
+    
+    def _mcp_probe_is_fresh(self, probe):
+        """Cached probe is valid for MCP_PROBE_TTL unless project MCP settings changed since"""
+        # Only a positive result is reused: `claude mcp add` (local scope by default) writes
+        # ~/.claude.json, which can't be watched here, so a missing server is always re-probed
+        if not probe.get('configured'):
+            return False
+        try:
+            checked_at = datetime.fromisoformat(probe['checked_at'])
+        except (KeyError, TypeError, ValueError):
             return False
+        if datetime.now() - checked_at > MCP_PROBE_TTL:
+            return False
+        
+        # `claude mcp add --scope project` rewrites .mcp.json
+        mcp_json_path = os.path.join(self.project_dir, '.mcp.json')
+        try:
+            return os.path.getmtime(mcp_json_path) <= checked_at.timestamp()
+        except OSError:
+            return True
     
     def detect_user_identity(self):
         """Detect user identity for testing"""
@@ -113,9 +251,20 @@ class TigSessionManager:
         
         return user_id, user_email
     
-    def auto_sync_contextbase(self):
+    def auto_sync_contextbase(self, mcp_configured=None):
         """Automatically sync with contextbase if MCP server is available"""
-        if not self.check_mcp_server():
+        if mcp_configured is None:
+            mcp_configured = self.check_mcp_server()
+        
+        config = self.load_config()
+        if self.mcp_probed:
+            self._save_mcp_probe(mcp_configured)
+            # config.json is tracked in submodule mode: only rewrite it when the result changes
+            if config.get('mcp_server_configured', False) != mcp_configured:
+                config['mcp_server_configured'] = mcp_configured
+                self.save_config(config)
+        
+        if not mcp_configured:
             print("📝 Tig: No contextbase configured - starting in local mode")
             return False
             
@@ -125,12 +274,9 @@ class TigSessionManager:
             # This will be handled by MCP server calling get_project_context()
             # which provides Claude with the latest contextbase information
             
-            config = self.load_config()
-            config['last_sync'] = datetime.now().isoformat()
+            config['last_sync'] = self.now
             config['mcp_server_configured'] = True
-            
-            with open(self.config_path, 'w') as f:
-                json.dump(config, f, indent=2)
+            self.save_config(config)
                 
             print("✅ Tig: Contextbase sync complete")
             return True
@@ -144,18 +290,21 @@ class TigSessionManager:
         # Load existing session state to preserve conversation counter
         existing_counter = 1
         
-        # First, sync with micro_index.json if it exists (source of truth)
-        micro_index_path = os.path.join(self.tig_dir, 'micro_index.json')
-        if os.path.exists(micro_index_path):
-            try:
-                with open(micro_index_path, 'r') as f:
-                    micro_index = json.load(f)
-                    # Next conversation should be last_conversation_id + 1
-                    existing_counter = micro_index.get('last_conversation_id', 0) + 1
-            except:
-                pass  # Fall back to session state
+        # First, sync with the index counters if they exist (source of truth);
+        # older .tig directories keep them in micro_index.json
+        for counters_path in (os.path.join(self.tig_dir, 'index', 'counters.json'),
+                              os.path.join(self.tig_dir, 'micro_index.json')):
+            if os.path.exists(counters_path):
+                try:
+                    with open(counters_path, 'r') as f:
+                        counters = json.load(f)
+                        # Next conversation should be last_conversation_id + 1
+                        existing_counter = counters.get('last_conversation_id', 0) + 1
+                except:
+                    pass  # Fall back to session state
+                break
         
-        # If no micro_index, try to preserve existing session state counter
+        # If no index, try to preserve existing session state counter
         if existing_counter == 1 and os.path.exists(self.session_state_path):
             try:
                 with open(self.session_state_path, 'r') as f:
@@ -171,28 +320,36 @@ class TigSessionManager:
             'current_conversation': None,
             'conversation_counter': existing_counter,  # ✅ PRESERVE EXISTING COUNTER
             'message_counter': 1,
-            'start_time': datetime.now().isoformat(),
+            'start_time': self.now,
             'tracked_files': {},
             'pending_changes': []
         }
         
-        with open(self.session_state_path, 'w') as f:
-            json.dump(session_state, f, indent=2)
+        atomic_write_json(self.session_state_path, session_state)
+        
+        # Events and messages left by a conversation that never reached Stop belong to the
+        # old session state; drop them so they aren't merged into a reused conv_NNN
+        for log_name in ('events.jsonl', 'messages.jsonl'):
+            try:
+                os.remove(os.path.join(self.tig_dir, log_name))
+            except FileNotFoundError:
+                pass
 
     def start_blame_api(self):
         """
         Start the Tig Blame API server if not already running
         """
         try:
-            # Check if API is already running
-            import urllib.request
-            try:
-                urllib.request.urlopen('http://localhost:8000/health', timeout=2)
-                return True  # Already running
-            except:
-                pass  # Not running, continue to start it
+            # Check if API is already running (bare TCP connect, no HTTP/DNS round trip)
+            import socket
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+                probe.settimeout(0.05)
+                if probe.connect_ex(('127.0.0.1', 8000)) == 0:
+                    return True  # Already running
             
             # Find the tig project root (where tig_blame_api.py is located)
+            import subprocess
+            from pathlib import Path
             current_dir = Path(os.getcwd())
             tig_root = None
             
@@ -222,6 +379,7 @@ class TigSessionManager:
         """Set up .tig as submodule if in a git repository and not already configured"""
         try:
             # Check if we're in a git repository
+            import subprocess
             result = subprocess.run(['git', 'rev-parse', '--git-dir'], 
                                   cwd=self.project_dir, capture_output=True)
             if result.returncode != 0:
@@ -229,12 +387,9 @@ class TigSessionManager:
                 return False
             
             # Check if submodule already configured
-            gitmodules_path = os.path.join(self.project_dir, '.gitmodules')
-            if os.path.exists(gitmodules_path):
-                with open(gitmodules_path, 'r') as f:
-                    if 'path = .tig' in f.read():
-                        print("ℹ️  Tig submodule already configured")
-                        return True
+            if self._is_tig_submodule():
+                print("ℹ️  Tig submodule already configured")
+                return True
             
             # Import and run submodule setup
             sys.path.append(self.project_dir)
@@ -244,6 +399,7 @@ class TigSessionManager:
             success = manager.setup_tig_submodule()
             
             if success:
+                self._tig_submodule = True
                 print("🎉 Tig submodule auto-configured for git-native branching!")
             
             return success
@@ -261,26 +417,29 @@ def main():
         project_dir = os.getcwd()
         session_manager = TigSessionManager(project_dir)
         
-        # Set up submodule FIRST (before creating any .tig structure)
-        session_manager.setup_submodule_if_needed()
-        
-        # Ensure directory structure (only if not submodule)
-        session_manager.ensure_tig_structure()
-        
-        # Load configuration
-        session_manager.load_config()
-        
-        # Auto-sync contextbase
-        session_manager.auto_sync_contextbase()
-        
-        # Detect user identity
-        user_id, user_email = session_manager.detect_user_identity()
-        
-        # Initialize session state
-        session_manager.initialize_session_state(session_id, user_id, user_email)
-        
-        # Start Tig Blame API server
-        session_manager.start_blame_api()
+        # Blame API startup and the MCP probe don't depend on .tig, so they
+        # overlap with the (serial) git/filesystem setup below
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # Start Tig Blame API server
+            blame_api = pool.submit(session_manager.start_blame_api)
+            mcp_probe = pool.submit(session_manager.check_mcp_server)
+            
+            # Set up submodule FIRST (before creating any .tig structure)
+            session_manager.setup_submodule_if_needed()
+            
+            # Ensure directory structure (only if not submodule)
+            session_manager.ensure_tig_structure()
+            
+            # Load configuration and auto-sync contextbase
+            session_manager.auto_sync_contextbase(mcp_probe.result())
+            
+            # Detect user identity
+            user_id, user_email = session_manager.detect_user_identity()
+            
+            # Initialize session state
+            session_manager.initialize_session_state(session_id, user_id, user_email)
+            
+            blame_api.result()
         
         # Output for Claude
         output = {
@@ -1,6 +1,9 @@
 #!/usr/bin/env uv run
 # /// script
-# dependencies = []
+# dependencies = [
+#   "orjson>=3.9.0",
+#   "pygit2>=1.14.0"
+# ]
 # ///
 """
 Stop Hook - Process completed conversations for Tig
@@ -8,33 +11,216 @@ Stop Hook - Process completed conversations for Tig
 import json
 import sys
 import os
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# orjson parses and serializes several times faster than the stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dump_json(obj, indent=True):
+    """Serialize to JSON bytes (indented unless a compact line is wanted), using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def parse_json(data):
+    """Parse JSON bytes, using orjson when available"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def load_json(path):
+    """Parse a JSON file in one read, using orjson when available"""
+    with open(path, 'rb') as f:
+        return parse_json(f.read())
+
+def atomic_write(path, data):
+    """Write bytes to a temp file in one buffered write, fsync, and rename it over path"""
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'wb', buffering=1 << 20) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def atomic_write_json(path, obj):
+    """Write JSON atomically, so a crashed hook never leaves a truncated file"""
+    atomic_write(path, dump_json(obj))
+
+# Transcript tail is read backwards in blocks of this size
+TRANSCRIPT_BLOCK_SIZE = 1 << 16
+
+def iter_lines_reversed(f, block_size=TRANSCRIPT_BLOCK_SIZE):
+    """Yield the lines of a binary file from last to first, reading only as far back as consumed"""
+    position = f.seek(0, os.SEEK_END)
+    remainder = b''
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        lines = (f.read(read_size) + remainder).split(b'\n')
+        # The first piece may be the tail of a line that starts in an earlier block
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            yield line
+    yield remainder
+
+# tig_auto_commit module from the project root, loaded once per process
+_tig_auto_commit = None
+
+def load_tig_auto_commit(project_dir):
+    """Load tig_auto_commit.py straight from the project root (no sys.path search)"""
+    global _tig_auto_commit
+    if _tig_auto_commit is None:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(
+            'tig_auto_commit', os.path.join(project_dir, 'tig_auto_commit.py')
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)  # Source loader, so __pycache__ bytecode is reused
+        _tig_auto_commit = module
+    return _tig_auto_commit
+
+class SubprocessGit:
+    """Minimal git handle on .tig (the GitSession subset the processor uses), so conversation
+    commits don't depend on loading tig_auto_commit.py"""
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def add(self, paths):
+        """Stage the given paths (relative to the repository root)"""
+        import subprocess
+        subprocess.run(['git', 'add', '--', *paths], cwd=self.path, check=True)
+    
+    def changed_paths(self):
+        """Paths (relative to the repository root) that differ from HEAD, staged or not"""
+        import subprocess
+        result = subprocess.run(
+            ['git', 'status', '--porcelain', '-z', '--untracked-files=all', '--no-renames'],
+            cwd=self.path, capture_output=True, text=True, check=True
+        )
+        return {entry[3:] for entry in result.stdout.split('\0') if entry}
+    
+    def commit(self, message):
+        """Commit the index and return the new HEAD SHA, or None if nothing was committed"""
+        import subprocess
+        result = subprocess.run(['git', 'commit', '-q', '-m', message], cwd=self.path, capture_output=True)
+        if result.returncode != 0:
+            return None
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=self.path,
+                              capture_output=True, text=True).stdout.strip()
+
+def load_tig_file(tig_file_path):
+    """Read a shadow .tig file as {'file_path', 'history'}, whether JSONL or the legacy single JSON object"""
+    with open(tig_file_path, 'rb') as f:
+        data = f.read()
+    try:
+        legacy = parse_json(data)
+        if isinstance(legacy, dict) and 'history' in legacy:
+            return legacy
+    except ValueError:
+        pass  # More than one line: JSONL
+    
+    try:
+        file_path = load_json(f"{tig_file_path}.meta.json").get('file_path')
+    except (OSError, ValueError):
+        file_path = None
+    return {
+        'file_path': file_path,
+        'history': [parse_json(line) for line in data.splitlines() if line.strip()]
+    }
+
 class TigConversationProcessor:
-    def __init__(self, tig_dir):
+    def __init__(self, tig_dir, git=None):
         self.tig_dir = tig_dir
+        self.git = git  # GitSession on .tig, shared with TigAutoCommit
         self.git_dir = os.path.join(tig_dir, '.git')
-        self.micro_index_path = os.path.join(tig_dir, 'micro_index.json')
+        self.micro_index_path = os.path.join(tig_dir, 'micro_index.json')  # Legacy single-file index
+        self.index_dir = os.path.join(tig_dir, 'index')
+        self.counters_path = os.path.join(self.index_dir, 'counters.json')
+        self.snapshots_path = os.path.join(self.index_dir, 'snapshots.jsonl')
+        self.conversations_path = os.path.join(self.index_dir, 'conversations.jsonl')
         self.shadow_dir = os.path.join(tig_dir, 'shadow')
+        self.events_path = os.path.join(tig_dir, 'events.jsonl')
+        self.messages_path = os.path.join(tig_dir, 'messages.jsonl')
+        self.objects_dir = os.path.join(tig_dir, 'objects')  # PostToolUse blob store
+        self.counters = None  # Loaded once per hook run
         
-    def load_micro_index(self):
-        """Load existing micro_index.json or create new one"""
-        if os.path.exists(self.micro_index_path):
-            with open(self.micro_index_path, 'r') as f:
-                return json.load(f)
-        return {
-            'conversations': {},
-            'snapshots': {},
-            'last_conversation_id': 0,
-            'last_snapshot_id': 0,
-            'file_index': {}
+    def load_counters(self):
+        """Load the index counters (the only index state the write path needs)"""
+        if self.counters is not None:
+            return self.counters
+        if os.path.exists(self.counters_path):
+            self.counters = load_json(self.counters_path)
+        elif os.path.exists(self.micro_index_path):
+            self.counters = self._migrate_micro_index()
+        else:
+            self.counters = {
+                'last_conversation_id': 0,
+                'last_snapshot_id': 0
+            }
+        return self.counters
+    
+    def _migrate_micro_index(self):
+        """Split a legacy micro_index.json into index/counters.json and append-only logs"""
+        micro_index = load_json(self.micro_index_path)
+        os.makedirs(self.index_dir, exist_ok=True)
+        atomic_write(self.snapshots_path, b''.join(
+            dump_json(snapshot, indent=False) + b'\n' for snapshot in micro_index.get('snapshots', {}).values()
+        ))
+        atomic_write(self.conversations_path, b''.join(
+            dump_json(conversation, indent=False) + b'\n' for conversation in micro_index.get('conversations', {}).values()
+        ))
+        counters = {
+            'last_conversation_id': micro_index.get('last_conversation_id', 0),
+            'last_snapshot_id': micro_index.get('last_snapshot_id', 0)
         }
+        atomic_write_json(self.counters_path, counters)
+        os.remove(self.micro_index_path)
+        return counters
+    
+    def append_index(self, snapshots, conversation):
+        """Append a conversation and its snapshots to the index logs, then save the counters"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        if snapshots:
+            with open(self.snapshots_path, 'ab') as f:
+                f.write(b''.join(dump_json(snapshot, indent=False) + b'\n' for snapshot in snapshots))
+        with open(self.conversations_path, 'ab') as f:
+            f.write(dump_json(conversation, indent=False) + b'\n')
+        atomic_write_json(self.counters_path, self.counters)
+    
+    def load_file_changes(self, conversation):
+        """Rebuild the conversation's file_changes from the PostToolUse events log"""
+        file_changes = conversation.setdefault('file_changes', {})
+        if os.path.exists(self.events_path):
+            with open(self.events_path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        change = parse_json(line)
+                        if change.get('conversation_id') == conversation['id']:
+                            file_changes.setdefault(change['file_path'], []).append(change)
+        return file_changes
+    
+    def read_blob_preview(self, change, limit=100):
+        """Read the start of a change's stored file copy for snapshot summaries"""
+        blob = change.get('tig_blob')
+        if not blob:
+            # Legacy records carried the file body inline
+            return (change.get('content') or '')[:limit]
+        try:
+            with open(os.path.join(self.tig_dir, blob), 'rb') as f:
+                return f.read(limit * 4).decode('utf-8', errors='replace')[:limit]
+        except OSError:
+            return ''
     
     def parse_transcript(self, transcript_path, conversation_start_time):
         """Parse JSONL transcript to extract AI responses for current conversation only"""
         conversation_data = {
-            'ai_responses': [],
+            'ai_responses': (),  # Newest first
             'tool_operations': []
         }
         
@@ -42,37 +228,42 @@ class TigConversationProcessor:
             return conversation_data
             
         try:
-            all_responses = []
+            recent_responses = []
+            recent_operations = []
             
-            with open(transcript_path, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        entry = json.loads(line)
+            # Only the last few responses are kept, so walk the transcript from the end
+            # and stop once we have them instead of parsing the whole session
+            with open(transcript_path, 'rb') as f:
+                for line in iter_lines_reversed(f):
+                    if len(recent_responses) >= 4:
+                        break
+                    if not line.strip():
+                        continue
+                    entry = parse_json(line)
+                    
+                    if entry.get('type') == 'assistant':
+                        content = entry.get('message', {}).get('content', [])
                         
-                        if entry.get('type') == 'assistant':
-                            content = entry.get('message', {}).get('content', [])
-                            
-                            # Extract text responses
-                            text_content = []
-                            for item in content:
-                                if isinstance(item, dict) and item.get('type') == 'text':
-                                    text_content.append(item.get('text', ''))
-                                elif isinstance(item, dict) and item.get('type') == 'tool_use':
-                                    conversation_data['tool_operations'].append({
-                                        'tool_name': item.get('name'),
-                                        'tool_input': item.get('input', {}),
-                                        'timestamp': entry.get('timestamp')
-                                    })
-                            
-                            if text_content:
-                                response_text = ' '.join(text_content)
-                                all_responses.append(response_text)
+                        # Extract text responses
+                        text_content = []
+                        operations = []
+                        for item in content:
+                            if isinstance(item, dict) and item.get('type') == 'text':
+                                text_content.append(item.get('text', ''))
+                            elif isinstance(item, dict) and item.get('type') == 'tool_use':
+                                operations.append({
+                                    'tool_name': item.get('name'),
+                                    'tool_input': item.get('input', {}),
+                                    'timestamp': entry.get('timestamp')
+                                })
+                        recent_operations.extend(reversed(operations))
+                        
+                        if text_content:
+                            recent_responses.append(' '.join(text_content))
             
-            # Simple approach: Take the last 3-5 responses from the transcript
-            # This works because Claude Code conversations are typically recent responses
-            if all_responses:
-                # Take last 4 responses maximum, minimum 1
-                conversation_data['ai_responses'] = all_responses[-4:] if len(all_responses) > 4 else all_responses[-len(all_responses):]
+            # Last 4 responses maximum, already newest first from the reverse walk
+            conversation_data['ai_responses'] = tuple(recent_responses)
+            conversation_data['tool_operations'] = recent_operations[::-1]
                 
         except Exception as e:
             # If parsing fails completely, return empty but don't crash
@@ -80,72 +271,82 @@ class TigConversationProcessor:
             
         return conversation_data
     
-    def create_git_commit(self, file_path, conversation_data, change_data, change_index):
-        """Create Git commit for file change with descriptive message"""
+    def stage_all(self, files):
+        """Stage every changed .tig working copy with a single git add"""
+        # Only paths mirrored inside .tig (large/binary files are recorded without a copy)
+        existing = [
+            f for f in files
+            if not os.path.normpath(f).startswith(os.pardir)
+            and os.path.exists(os.path.join(self.tig_dir, f))
+        ]
+        if existing:
+            self.git.add(existing)
+        return existing
+    
+    def commit_batch(self, files, conversation_data, changes):
+        """Create one Git commit covering all of a conversation's file changes"""
         try:
-            # Stage the file
-            subprocess.run(['git', 'add', file_path], cwd=self.tig_dir, check=True)
+            if self.git is None or not self.stage_all(files):
+                return None
             
             # Create descriptive commit message
             user_prompt = conversation_data.get('user_prompt', 'No prompt available')
-            tool_name = change_data.get('tool_name', 'Unknown')
             
             # Truncate prompt if too long
             if len(user_prompt) > 60:
                 user_prompt = user_prompt[:57] + "..."
             
-            # Get file name for commit message
-            file_name = os.path.basename(file_path)
+            if len(changes) == 1:
+                file_path, change_data, _ = changes[0]
+                summary = f"{change_data.get('tool_name', 'Unknown')} {os.path.basename(file_path)}"
+            else:
+                summary = f"{len(changes)} changes to {len(files)} files"
+            
+            # List every change so the single commit keeps the per-change context
+            change_lines = '\n'.join(
+                f"Change #{i + 1}: {change_data.get('tool_name', 'Unknown')} {file_path} "
+                f"at {change_data.get('timestamp', 'Unknown')}"
+                for file_path, change_data, i in changes
+            )
             
             # Create multi-line commit message with context
-            commit_msg = f"""tig: {tool_name} {file_name} - {user_prompt}
+            commit_msg = f"""tig: {summary} - {user_prompt}
 
 Conversation: {conversation_data['id']}
 User Prompt: {conversation_data.get('user_prompt', 'No prompt available')}
-Tool: {tool_name}
-File: {file_path}
-Timestamp: {change_data.get('timestamp', 'Unknown')}
-Change #{change_index + 1} in conversation"""
-            
-            result = subprocess.run(
-                ['git', 'commit', '-m', commit_msg], 
-                cwd=self.tig_dir, 
-                capture_output=True, 
-                text=True
-            )
+{change_lines}"""
             
-            if result.returncode == 0:
-                # Get commit hash
-                hash_result = subprocess.run(
-                    ['git', 'rev-parse', 'HEAD'], 
-                    cwd=self.tig_dir, 
-                    capture_output=True, 
-                    text=True
-                )
-                return hash_result.stdout.strip()
+            return self.git.commit(commit_msg)
         except:
             pass
         
         return None
     
     def update_tig_file(self, file_path, conversation_data):
-        """Update .tig file with conversation history"""
+        """Append a conversation entry to the file's .tig history (one JSON line per entry)"""
         tig_file_path = os.path.join(self.shadow_dir, f"{file_path}.tig")
+        meta_path = f"{tig_file_path}.meta.json"
         os.makedirs(os.path.dirname(tig_file_path), exist_ok=True)
         
-        # Load existing or create new .tig file
-        if os.path.exists(tig_file_path):
-            with open(tig_file_path, 'r') as f:
-                tig_data = json.load(f)
-        else:
-            tig_data = {
-                'file_path': file_path,
-                'history': []
-            }
+        try:
+            meta = load_json(meta_path)
+        except FileNotFoundError:
+            # New file, or a legacy single-JSON .tig file converted to JSONL once
+            history = load_tig_file(tig_file_path)['history'] if os.path.exists(tig_file_path) else []
+            atomic_write(tig_file_path, b''.join(dump_json(entry, indent=False) + b'\n' for entry in history))
+            meta = {'file_path': file_path, 'entry_count': len(history)}
+        if 'entry_count' not in meta:
+            # Meta written before the count was kept there: count the lines once
+            try:
+                with open(tig_file_path, 'rb') as f:
+                    meta['entry_count'] = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 16), b''))
+            except FileNotFoundError:
+                meta['entry_count'] = 0
+        entry_count = meta['entry_count']
         
         # Add new history entry
         entry = {
-            'entry_id': f"entry_{len(tig_data['history']) + 1:03d}",
+            'entry_id': f"entry_{entry_count + 1:03d}",
             'conversation_id': conversation_data['id'],
             'snapshot_ids': conversation_data.get('snapshot_ids', []),
             'timestamp': conversation_data['timestamp'],
@@ -155,11 +356,18 @@ Change #{change_index + 1} in conversation"""
             'conversation_commit': conversation_data.get('commit_hash', '')
         }
         
-        tig_data['history'].append(entry)
-        
-        # Save updated .tig file
-        with open(tig_file_path, 'w') as f:
-            json.dump(tig_data, f, indent=2)
+        # Append without rereading or rewriting earlier entries; the count lives in the meta file
+        with open(tig_file_path, 'ab') as f:
+            f.write(dump_json(entry, indent=False) + b'\n')
+        meta['entry_count'] = entry_count + 1
+        atomic_write_json(meta_path, meta)
+    
+    def _pick_best_response(self, ai_responses):
+        """Newest non-empty response that isn't a generic greeting, else the newest response"""
+        for response in ai_responses:
+            if response and not response.strip().startswith("I see you've started"):
+                return response
+        return ai_responses[0] if ai_responses else ''
     
     def process_conversation(self, session_state, transcript_path=None):
         """Process current conversation and update local storage"""
@@ -172,116 +380,104 @@ Change #{change_index + 1} in conversation"""
         if transcript_path:
             transcript_data = self.parse_transcript(transcript_path, conv_data['start_time'])
         
-        micro_index = self.load_micro_index()
+        counters = self.load_counters()
         conv_id = conv_data['id']
+        now = datetime.now().isoformat()  # One timestamp per conversation
+        cwd = os.getcwd()
+        
+        # One status call tells which mirrored files actually changed since the last commit
+        file_changes = conv_data.get('file_changes', {})
+        changed_paths = self.git.changed_paths() if self.git is not None and file_changes else None
         
-        # Process file changes and create snapshots
+        # Process file changes and create snapshots, all sharing one Git commit
+        committed_files = [f for f in file_changes if changed_paths is not None and f in changed_paths]
+        changes = [
+            (file_path, change, i)
+            for file_path in committed_files
+            for i, change in enumerate(file_changes[file_path])
+        ]
+        commit_hash = None
+        if changes:
+            commit_hash = self.commit_batch(committed_files, conv_data, changes)
+        
+        snapshots = []
         snapshot_ids = []
-        for file_path, changes in conv_data.get('file_changes', {}).items():
-            for i, change in enumerate(changes):
-                # Create Git commit
-                commit_hash = self.create_git_commit(
-                    file_path, 
-                    conv_data, # Pass conversation_data
-                    change, # Pass change_data
-                    i # Pass change_index
-                )
+        file_to_snapshot_ids = {}
+        if commit_hash:
+            for file_path, change, i in changes:
+                # Create snapshot entry
+                snapshot_id = f"snap_{counters['last_snapshot_id'] + 1:03d}"
+                counters['last_snapshot_id'] += 1
+                snapshot_ids.append(snapshot_id)
+                file_to_snapshot_ids.setdefault(file_path, []).append(snapshot_id)
                 
-                if commit_hash:
-                    # Create snapshot entry
-                    snapshot_id = f"snap_{micro_index['last_snapshot_id'] + 1:03d}"
-                    micro_index['last_snapshot_id'] += 1
-                    snapshot_ids.append(snapshot_id)
-                    
-                    micro_index['snapshots'][snapshot_id] = {
-                        'id': snapshot_id,
-                        'conversation_id': conv_id,
-                        'tool_operation': f"{change['tool_name']}: {change.get('content', '')[:100]}...",
-                        'file_path': os.path.join(os.getcwd(), file_path),
-                        'commit': commit_hash,
-                        'timestamp': change['timestamp'],
-                        'sequence_number': len(snapshot_ids)
-                    }
-                    
-                    # Update file index
-                    if file_path not in micro_index['file_index']:
-                        micro_index['file_index'][file_path] = []
-                    micro_index['file_index'][file_path].append(conv_id)
+                snapshots.append({
+                    'id': snapshot_id,
+                    'conversation_id': conv_id,
+                    'tool_operation': f"{change['tool_name']}: {self.read_blob_preview(change)}...",
+                    'file_path': os.path.join(cwd, file_path),
+                    'commit': commit_hash,
+                    'timestamp': change['timestamp'],
+                    'sequence_number': len(snapshot_ids)
+                })
         
         # Create conversation entry
-        micro_index['last_conversation_id'] += 1
+        counters['last_conversation_id'] += 1
         
-        # Get the best AI response using the same logic as shadow files
-        ai_responses = transcript_data.get('ai_responses', [])
-        best_ai_response = ''
-        if ai_responses:
-            # Take the last response that's not empty and not a generic greeting
-            for response in reversed(ai_responses):
-                if response and not response.strip().startswith("I see you've started"):
-                    best_ai_response = response
-                    break
-            # If no relevant response found, take the last response
-            if not best_ai_response and ai_responses:
-                best_ai_response = ai_responses[-1]
+        # Get the best AI response once; shadow files reuse it
+        ai_responses = transcript_data.get('ai_responses', ())
+        best_ai_response = self._pick_best_response(ai_responses)
         
-        micro_index['conversations'][conv_id] = {
+        conversation = {
             'id': conv_id,
             'prompt': conv_data.get('user_prompt', ''),
             'start_time': conv_data['start_time'],
-            'end_time': datetime.now().isoformat(),
+            'end_time': now,
             'snapshot_ids': snapshot_ids,
             'responses': [best_ai_response] if best_ai_response else [],  # Single best response instead of all responses
             'status': 'complete',
-            'last_activity': datetime.now().isoformat(),
+            'last_activity': now,
             'conversation_commit': snapshot_ids[-1] if snapshot_ids else None,
             'user_id': conv_data.get('user_id', 'unknown_user'),
             'user_email': conv_data.get('user_email', 'unknown@example.com')
         }
         
-        # Update .tig files for each modified file
-        for file_path in conv_data.get('file_changes', {}).keys():
-            # Get the most relevant AI response (last non-empty response)
-            ai_responses = transcript_data.get('ai_responses', [])
-            relevant_ai_response = ''
-            
-            if ai_responses:
-                # Take the last response that's not empty and not a generic greeting
-                for response in reversed(ai_responses):
-                    if response and not response.strip().startswith("I see you've started"):
-                        relevant_ai_response = response
-                        break
-                # If no relevant response found, take the last response
-                if not relevant_ai_response and ai_responses:
-                    relevant_ai_response = ai_responses[-1]
+        # Get the most relevant AI response for shadow files (same for every file)
+        if ai_responses:
+            relevant_ai_response = best_ai_response
+        else:
+            # Fallback: create a descriptive response based on the user prompt and tool operations
+            user_prompt = conv_data.get('user_prompt', '')
+            if user_prompt and len(user_prompt.strip()) > 1:
+                # Generate a basic response based on the user prompt
+                relevant_ai_response = f"Processed request: {user_prompt}"
             else:
-                # Fallback: create a descriptive response based on the user prompt and tool operations
-                user_prompt = conv_data.get('user_prompt', '')
-                if user_prompt and len(user_prompt.strip()) > 1:
-                    # Generate a basic response based on the user prompt
-                    relevant_ai_response = f"Processed request: {user_prompt}"
-                else:
-                    relevant_ai_response = "File modified by Claude"
+                relevant_ai_response = "File modified by Claude"
+        
+        # Collect .tig file updates for each modified file
+        tig_updates = []
+        for file_path, changes in file_changes.items():
+            # Skip files whose mirrored copy is unchanged on disk (files recorded
+            # without a mirror, e.g. large binaries, always get their entry)
+            if (changed_paths is not None and file_path not in changed_paths
+                    and os.path.exists(os.path.join(self.tig_dir, file_path))):
+                continue
             
             # Get only the tool operations that affected THIS specific file
-            file_specific_operations = []
-            if file_path in conv_data.get('file_changes', {}):
-                for change in conv_data['file_changes'][file_path]:
-                    file_specific_operations.append(f"{change['tool_name']}: {str(change['tool_input'])}")
+            file_specific_operations = [
+                f"{change['tool_name']}: {str(change['tool_input'])}" for change in changes
+            ]
             
             # Get only the snapshots that affected THIS specific file
-            file_specific_snapshot_ids = []
-            file_specific_commit = None
-            for snapshot_id in snapshot_ids:
-                if snapshot_id in micro_index['snapshots']:
-                    snapshot = micro_index['snapshots'][snapshot_id]
-                    # Check if this snapshot's file_path matches our current file
-                    snapshot_file_path = os.path.relpath(snapshot['file_path'], os.getcwd())
-                    if snapshot_file_path == file_path:
-                        file_specific_snapshot_ids.append(snapshot_id)
-                        # The last snapshot for this file becomes the conversation commit
-                        file_specific_commit = snapshot_id
+            file_specific_snapshot_ids = file_to_snapshot_ids.get(file_path, [])
+            # The last snapshot for this file becomes the conversation commit
+            file_specific_commit = file_specific_snapshot_ids[-1] if file_specific_snapshot_ids else None
+            
+            # Nothing to record for this file
+            if not file_specific_snapshot_ids and not file_specific_operations:
+                continue
             
-            self.update_tig_file(file_path, {
+            tig_updates.append((file_path, {
                 'id': conv_id,
                 'snapshot_ids': file_specific_snapshot_ids,  # Only snapshots for this file
                 'timestamp': conv_data['start_time'],
@@ -291,11 +487,17 @@ Change #{change_index + 1} in conversation"""
                 'commit_hash': file_specific_commit,  # Last snapshot for this specific file
                 'user_id': conv_data.get('user_id', 'unknown_user'),
                 'user_email': conv_data.get('user_email', 'unknown@example.com')
-            })
+            }))
         
-        # Save updated micro_index
-        with open(self.micro_index_path, 'w') as f:
-            json.dump(micro_index, f, indent=2)
+        # Each file has its own shadow path, so the I/O-bound writes run in parallel
+        if len(tig_updates) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(tig_updates))) as executor:
+                list(executor.map(lambda update: self.update_tig_file(*update), tig_updates))
+        elif tig_updates:
+            self.update_tig_file(*tig_updates[0])
+        
+        # Save index records (before auto-commit stages .tig)
+        self.append_index(snapshots, conversation)
     
     # Old auto-commit implementation removed - now using standalone tig_auto_commit.py
     
@@ -326,7 +528,7 @@ Change #{change_index + 1} in conversation"""
 
 def main():
     try:
-        input_data = json.load(sys.stdin)
+        input_data = parse_json(sys.stdin.buffer.read())
         transcript_path = input_data.get('transcript_path')
         
         tig_dir = os.path.join(os.getcwd(), '.tig')
@@ -337,11 +539,25 @@ def main():
             sys.exit(0)
         
         # Load session state
-        with open(session_state_path, 'r') as f:
-            session_state = json.load(f)
+        with open(session_state_path, 'rb') as f:
+            session_state_bytes = f.read()
+        session_state = parse_json(session_state_bytes)
+        
+        # One Git handle on .tig for both conversation processing and auto-commit
+        project_dir = os.path.dirname(tig_dir)
+        try:
+            tig_auto_commit = load_tig_auto_commit(project_dir)
+            tig_git = tig_auto_commit.GitSession(tig_dir)
+        except Exception as e:
+            print(f"⚠️  tig_auto_commit.py unavailable, committing with git directly: {e}")
+            tig_auto_commit = None
+            tig_git = SubprocessGit(tig_dir)
         
         # Process the conversation (existing functionality)
-        processor = TigConversationProcessor(tig_dir)
+        processor = TigConversationProcessor(tig_dir, tig_git)
+        current_conv = session_state.get('current_conversation')
+        if current_conv and isinstance(current_conv, dict):
+            processor.load_file_changes(current_conv)
         try:
             processor.process_conversation(session_state, transcript_path)
         except Exception as e:
@@ -349,27 +565,36 @@ def main():
         
         # Extract AI-modified files BEFORE resetting current_conversation
         ai_modified_files = []
-        current_conv = session_state.get('current_conversation')
         if current_conv and isinstance(current_conv, dict):
             file_changes = current_conv.get('file_changes', {})
             ai_modified_files = list(file_changes.keys())
         
-        # Reset current conversation
+        # Reset current conversation; its events, messages and stored blobs have been consumed
+        # (.tig working copies are separate links to the same data, so they are unaffected)
         session_state['current_conversation'] = None
+        for log_path in (processor.events_path, processor.messages_path):
+            if os.path.exists(log_path):
+                os.remove(log_path)
+        if os.path.isdir(processor.objects_dir):
+            import shutil
+            shutil.rmtree(processor.objects_dir, ignore_errors=True)
         
         # Auto-commit context and stage AI files 
-        try:
-            # Use standalone auto-commit utility for reliability
-            project_dir = os.path.dirname(tig_dir)
-            sys.path.append(project_dir)
-            from tig_auto_commit import TigAutoCommit
-            
-            auto_commit = TigAutoCommit(project_dir)
-            auto_commit.auto_commit_after_conversation(ai_modified_files)
-        except Exception as e:
-            print(f"⚠️  Auto-commit failed: {e}")
-        with open(session_state_path, 'w') as f:
-            json.dump(session_state, f, indent=2)
+        if tig_auto_commit is None:
+            print("ℹ️  tig_auto_commit.py not available, skipping auto-commit")
+        else:
+            try:
+                # Use standalone auto-commit utility for reliability
+                auto_commit = tig_auto_commit.TigAutoCommit(project_dir, tig_git)
+                auto_commit.auto_commit_after_conversation(ai_modified_files)
+            except Exception as e:
+                print(f"⚠️  Auto-commit failed: {e}")
+        
+        # Skip the rewrite (and fsync) when the state is byte-for-byte unchanged,
+        # e.g. Stop fired with no conversation in progress
+        new_state_bytes = dump_json(session_state)
+        if new_state_bytes != session_state_bytes:
+            atomic_write(session_state_path, new_state_bytes)
             
     except Exception as e:
         print(f"❌ Stop Hook error: {e}")
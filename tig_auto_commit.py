@@ -1,6 +1,9 @@
 #!/usr/bin/env uv run
 # /// script
-# dependencies = []
+# dependencies = [
+#   "orjson>=3.9.0",
+#   "pygit2>=1.14.0"
+# ]
 # ///
 """
 Tig Auto-Commit - Auto-commit context and stage AI files after conversations
@@ -11,12 +14,95 @@ import subprocess
 import json
 from pathlib import Path
 
+# orjson parses several times faster than the stdlib decoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class GitSession:
+    """One Git handle per hook run: in-process libgit2 via pygit2, git subprocesses without it"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            import pygit2
+            self.repo = pygit2.Repository(path)
+        except Exception:
+            self.repo = None  # pygit2 missing or repository unreadable
+    
+    def _index(self):
+        """Repository index, re-read in case a git subprocess changed it"""
+        index = self.repo.index
+        index.read(False)
+        return index
+    
+    def add(self, paths: list):
+        """Stage the given paths (relative to the repository root)"""
+        if self.repo is None:
+            subprocess.run(['git', 'add', '--', *paths], cwd=self.path, check=True)
+            return
+        index = self._index()
+        for path in paths:
+            index.add(path)
+        index.write()
+    
+    def add_all(self):
+        """Stage everything in the working tree, like `git add .`"""
+        if self.repo is None:
+            subprocess.run(['git', 'add', '.'], cwd=self.path, check=True)
+            return
+        index = self._index()
+        index.add_all()
+        index.write()
+    
+    def changed_paths(self) -> set:
+        """Paths (relative to the repository root) that differ from HEAD, staged or not"""
+        if self.repo is None:
+            result = subprocess.run(
+                ['git', 'status', '--porcelain', '-z', '--untracked-files=all', '--no-renames'],
+                cwd=self.path, capture_output=True, text=True, check=True
+            )
+            return {entry[3:] for entry in result.stdout.split('\0') if entry}
+        import pygit2
+        return {
+            path for path, flags in self.repo.status().items()
+            if flags not in (pygit2.GIT_STATUS_CURRENT, pygit2.GIT_STATUS_IGNORED)
+        }
+    
+    def commit(self, message: str) -> str:
+        """Commit the index and return the new HEAD SHA, or None if nothing was committed"""
+        if self.repo is None:
+            result = subprocess.run(['git', 'commit', '-m', message], 
+                                  cwd=self.path, capture_output=True, text=True)
+            if result.returncode != 0:
+                return None
+            hash_result = subprocess.run(['git', 'rev-parse', 'HEAD'], 
+                                       cwd=self.path, capture_output=True, text=True)
+            return hash_result.stdout.strip()
+        
+        tree = self._index().write_tree()
+        parents = []
+        if not self.repo.head_is_unborn:
+            head = self.repo.head.peel()
+            if head.tree.id == tree:
+                return None  # Nothing to commit
+            parents = [head.id]
+        signature = self.repo.default_signature
+        if not message.endswith('\n'):
+            message += '\n'
+        return str(self.repo.create_commit('HEAD', signature, signature, message, tree, parents))
+
 class TigAutoCommit:
     """Handles auto-committing context and staging AI files"""
     
-    def __init__(self, project_dir: str = None):
+    def __init__(self, project_dir: str = None, tig_git: GitSession = None):
         self.project_dir = project_dir or os.getcwd()
         self.tig_dir = os.path.join(self.project_dir, '.tig')
+        # Callers that already hold a handle on .tig (e.g. the Stop hook) share it
+        self.tig_git = tig_git or GitSession(self.tig_dir)
+        self.main_git = GitSession(self.project_dir)
+        self._submodule_configured = None
     
     def auto_commit_after_conversation(self, ai_modified_files: list = None):
         """
@@ -45,12 +131,9 @@ class TigAutoCommit:
             # 1. Auto-commit context to .tig submodule
             self._commit_context_to_submodule()
             
-            # 2. Stage AI-modified files in main repo (but don't commit)
+            # 2. Stage AI-modified files and the submodule update in main repo (but don't commit)
             self._stage_ai_files_in_main_repo(ai_modified_files)
             
-            # 3. Stage submodule update (but don't commit)
-            self._stage_submodule_update()
-            
             print(f"✅ Context auto-committed, {len(ai_modified_files)} files staged")
             print("💡 Run 'git commit -m \"your message\"' when ready")
             
@@ -61,40 +144,47 @@ class TigAutoCommit:
             return False
     
     def _is_submodule_configured(self) -> bool:
-        """Check if .tig is configured as a submodule"""
-        gitmodules_path = os.path.join(self.project_dir, '.gitmodules')
-        if os.path.exists(gitmodules_path):
-            with open(gitmodules_path, 'r') as f:
-                return 'path = .tig' in f.read()
-        return False
+        """Check if .tig is configured as a submodule (cached; .gitmodules doesn't change mid-run)"""
+        if self._submodule_configured is None:
+            try:
+                with open(os.path.join(self.project_dir, '.gitmodules'), 'rb') as f:
+                    self._submodule_configured = b'path = .tig' in f.read()
+            except FileNotFoundError:
+                self._submodule_configured = False
+        return self._submodule_configured
     
-    def _detect_ai_modified_files(self) -> list:
-        """Detect files modified by AI from micro_index snapshots"""
-        ai_files = []
+    def _load_snapshots(self) -> list:
+        """Read snapshot records from index/snapshots.jsonl (or a legacy micro_index.json)"""
+        loads = orjson.loads if orjson is not None else json.loads
+        snapshots_path = os.path.join(self.tig_dir, 'index', 'snapshots.jsonl')
+        if os.path.exists(snapshots_path):
+            with open(snapshots_path, 'rb') as f:
+                return [loads(line) for line in f if line.strip()]
         
-        # Read micro_index.json to get recent snapshots
         micro_index_path = os.path.join(self.tig_dir, 'micro_index.json')
         if os.path.exists(micro_index_path):
-            try:
-                with open(micro_index_path, 'r') as f:
-                    micro_index = json.load(f)
-                
-                # Get the most recent conversation from snapshots
-                snapshots = micro_index.get('snapshots', {})
-                if snapshots:
-                    # Get unique file paths from all snapshots
-                    file_paths = set()
-                    for snapshot_data in snapshots.values():
-                        file_path = snapshot_data.get('file_path', '')
-                        if file_path:
-                            rel_path = self._make_relative_path(file_path)
-                            if rel_path:
-                                file_paths.add(rel_path)
-                    
-                    ai_files = list(file_paths)
-                    
-            except Exception as e:
-                print(f"⚠️  Could not read micro_index: {e}")
+            with open(micro_index_path, 'rb') as f:
+                return list(loads(f.read()).get('snapshots', {}).values())
+        return []
+    
+    def _detect_ai_modified_files(self) -> list:
+        """Detect files modified by AI from index snapshots"""
+        ai_files = []
+        
+        try:
+            # Get unique file paths from all snapshots
+            file_paths = set()
+            for snapshot_data in self._load_snapshots():
+                file_path = snapshot_data.get('file_path', '')
+                if file_path:
+                    rel_path = self._make_relative_path(file_path)
+                    if rel_path:
+                        file_paths.add(rel_path)
+            
+            ai_files = list(file_paths)
+            
+        except Exception as e:
+            print(f"⚠️  Could not read snapshot index: {e}")
         
         return ai_files
     
@@ -107,38 +197,32 @@ class TigAutoCommit:
     
     def _commit_context_to_submodule(self):
         """Auto-commit conversation context to .tig submodule"""
-        # Stage all changes in .tig
-        subprocess.run(['git', 'add', '.'], cwd=self.tig_dir, check=True)
-        
-        # Check if there are changes to commit
-        result = subprocess.run(['git', 'diff', '--cached', '--quiet'], 
-                              cwd=self.tig_dir, capture_output=True)
+        # One status check up front; nothing to stage or commit when .tig is clean
+        if not self.tig_git.changed_paths():
+            print("ℹ️  No context changes to commit")
+            return
         
-        if result.returncode != 0:  # There are changes
-            subprocess.run(['git', 'commit', '-m', 'tig: Update conversation context'], 
-                         cwd=self.tig_dir, check=True)
+        # Stage all changes in .tig and commit them
+        self.tig_git.add_all()
+        if self.tig_git.commit('tig: Update conversation context') is not None:
             print("✅ Context committed to .tig submodule")
         else:
             print("ℹ️  No context changes to commit")
     
     def _stage_ai_files_in_main_repo(self, ai_files: list):
-        """Stage AI-modified files in main repository (but don't commit)"""
-        staged_files = []
+        """Stage AI-modified files and the .tig submodule update in main repository (but don't commit)"""
+        staged_files = [
+            file_path for file_path in ai_files
+            if os.path.exists(os.path.join(self.project_dir, file_path))
+        ]
         
-        for file_path in ai_files:
-            full_path = os.path.join(self.project_dir, file_path)
-            if os.path.exists(full_path):
-                subprocess.run(['git', 'add', file_path], cwd=self.project_dir, check=True)
-                staged_files.append(file_path)
+        # A single add for every file plus the submodule pointer
+        self.main_git.add(staged_files + ['.tig'])
         
         if staged_files:
             print(f"✅ Staged {len(staged_files)} AI-modified files")
         else:
             print("ℹ️  No AI-modified files to stage")
-    
-    def _stage_submodule_update(self):
-        """Stage .tig submodule update in main repository (but don't commit)"""
-        subprocess.run(['git', 'add', '.tig'], cwd=self.project_dir, check=True)
         print("✅ Staged .tig submodule update")
 
 def main():
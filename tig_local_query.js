@@ -2,7 +2,8 @@
 /**
  * Tig Local Query Engine (Node)
  * Mirrors tig_local_query.py behavior: given a commit hash and file path,
- * reads .tig/micro_index.json and shadow files to return conversation context.
+ * reads the .tig/index/ logs (or a legacy micro_index.json) and shadow files to
+ * return conversation context.
  */
 
 const fs = require('fs');
@@ -29,19 +30,49 @@ function loadJson(filePath, fallback) {
   }
 }
 
+function loadTigFile(shadowFile) {
+  // Shadow files are JSONL (one history entry per line); older ones are a single
+  // JSON object with a `history` array
+  const raw = fs.readFileSync(shadowFile, 'utf8');
+  try {
+    const legacy = JSON.parse(raw);
+    if (legacy && Array.isArray(legacy.history)) return legacy.history;
+  } catch (_) {
+    // More than one line: JSONL
+  }
+  return raw.split('\n').filter((line) => line.trim()).map((line) => JSON.parse(line));
+}
+
+function loadJsonl(filePath) {
+  return fs.readFileSync(filePath, 'utf8').split('\n').filter((line) => line.trim()).map((line) => JSON.parse(line));
+}
+
+function loadIndex(tigDir) {
+  // Snapshots and conversations are append-only JSONL under index/; older .tig
+  // directories keep everything in a single micro_index.json
+  const indexDir = path.join(tigDir, 'index');
+  if (!fs.existsSync(path.join(indexDir, 'counters.json'))) {
+    return loadJson(path.join(tigDir, 'micro_index.json'), { conversations: {}, snapshots: {} });
+  }
+  const index = { conversations: {}, snapshots: {} };
+  for (const kind of ['snapshots', 'conversations']) {
+    try {
+      for (const record of loadJsonl(path.join(indexDir, `${kind}.jsonl`))) {
+        if (record && record.id) index[kind][record.id] = record;
+      }
+    } catch (_) {
+      // Missing or unreadable log: nothing recorded yet
+    }
+  }
+  return index;
+}
+
 class TigLocalQuery {
   constructor(tigDir) {
     this.tigDir = tigDir || findTigDir();
     if (!this.tigDir) throw new Error('No .tig directory found');
-    this.microIndexPath = path.join(this.tigDir, 'micro_index.json');
     this.shadowDir = path.join(this.tigDir, 'shadow');
-    this.microIndex = loadJson(this.microIndexPath, {
-      conversations: {},
-      snapshots: {},
-      last_conversation_id: 0,
-      last_snapshot_id: 0,
-      file_index: {},
-    });
+    this.microIndex = loadIndex(this.tigDir);
   }
 
   getShadowContext(filePath, conversationId) {
@@ -49,8 +80,7 @@ class TigLocalQuery {
     const shadowFile = path.join(this.shadowDir, `${filename}.tig`);
     if (!fs.existsSync(shadowFile)) return {};
     try {
-      const data = JSON.parse(fs.readFileSync(shadowFile, 'utf8'));
-      const history = Array.isArray(data.history) ? data.history : [];
+      const history = loadTigFile(shadowFile);
       for (const entry of history) {
         if (entry && entry.conversation_id === conversationId) {
           return {
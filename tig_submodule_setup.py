@@ -1,32 +1,331 @@
 #!/usr/bin/env uv run
 # /// script
-# dependencies = []
+# dependencies = [
+#   "pygit2>=1.14.0"
+# ]
 # ///
 """
 Tig Submodule Setup - Enable git-native branching with clean PR history
 """
+from __future__ import annotations
+
+import io
 import os
 import sys
-import subprocess
-import tempfile
-import shutil
-import json
-from pathlib import Path
+from types import ModuleType
+
+# Type-checking-only imports; `typing` itself is skipped at runtime (it costs more than the rest)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import configparser
+    import subprocess
+    import threading
+    from typing import Any
+    
+    import pygit2
+
+# $1 = directory for the bare remote. Prints the author and committer identities
+# the initial commit is written with; the objects themselves never go through git.
+INIT_REMOTE_SCRIPT = (
+    'git init -q --bare --initial-branch=main "$1" && '
+    'git var GIT_AUTHOR_IDENT && '
+    'git var GIT_COMMITTER_IDENT'
+)
+
+# $1 = .tig work tree, $2 = project directory, $3 = bare remote, $4 = initial commit.
+# What `git submodule add` does after its clone: check out the work tree, record
+# the URL in .git/config and stage the gitlink plus .gitmodules
+REGISTER_SUBMODULE_SCRIPT = (
+    'git -C "$1" checkout -q -f main && '
+    'git -C "$2" config submodule..tig.url "$3" && '
+    'git -C "$2" config submodule..tig.active true && '
+    'git -C "$2" update-index --add --cacheinfo 160000,"$4",.tig && '
+    'git -C "$2" add .gitmodules'
+)
+
+TIG_SUBMODULE_SECTION = 'submodule ".tig"'
+
+# .gitmodules is the user's file: the .tig section is found and edited as text so comments,
+# key spelling and other submodules' entries are left exactly as they were
+TIG_SUBMODULE_HEADER = r'\s*\[\s*(?i:submodule)\s+"\.tig"\s*\]'
+SECTION_HEADER = r'\s*\['
+
+# Fixed file contents written during setup (same bytes json.dump(..., indent=2) produced)
+CONFIG_JSON = b'{\n  "version": "1.0",\n  "type": "tig-context"\n}'
+COUNTERS_JSON = b'{\n  "last_conversation_id": 0,\n  "last_snapshot_id": 0\n}'
+TIG_GITIGNORE = b'/session_state.json\n/events.jsonl\n/messages.jsonl\n/objects/\n'
+
+# Pack entry type codes
+PACK_OBJECT_TYPES = {'commit': 1, 'tree': 2, 'blob': 3}
+
+# Paths per `git add` call, well under the argv limit
+GIT_ADD_BATCH_SIZE = 1000
+
+# TIG_QUIET=1 (or --quiet) silences progress output; errors are always printed
+QUIET = bool(os.environ.get('TIG_QUIET'))
+
+def import_pygit2() -> ModuleType | None:
+    """libgit2 bindings for in-process git work, or None to fall back to git plumbing.
+    Imported only where used: the import alone costs tens of milliseconds"""
+    try:
+        import pygit2
+    except ImportError:
+        return None
+    return pygit2
+
+def status(message: str) -> None:
+    """Print a progress line unless running quietly"""
+    if not QUIET:
+        print(message)
+
+# subprocess only takes its posix_spawn fast path (no fork of the interpreter) for an
+# absolute executable, no cwd and no close_fds sweep; our fds are non-inheritable anyway
+SH = '/bin/sh'
+_git_executable: str | None = None
+
+def run_git(*args: str, cwd: str | None = None, **kwargs: Any) -> subprocess.CompletedProcess[Any]:
+    """Run git (in cwd via `git -C`) with subprocess.run, eligible for posix_spawn"""
+    import subprocess
+    global _git_executable
+    if _git_executable is None:
+        import shutil
+        _git_executable = shutil.which('git') or 'git'
+    command = [_git_executable, '-C', cwd, *args] if cwd else [_git_executable, *args]
+    return subprocess.run(command, close_fds=False, **kwargs)
+
+def run_script(script: str, *args: str, **kwargs: Any) -> subprocess.CompletedProcess[Any]:
+    """Run a shell script with positional args, eligible for posix_spawn"""
+    import subprocess
+    return subprocess.run([SH, '-c', script, 'sh', *args], close_fds=False, **kwargs)
+
+# Background deletions started by remove_dir_async, joined (briefly) at exit
+_pending_removals: list[threading.Thread] = []
+
+def remove_dir_async(path: str, scratch_dir: str) -> None:
+    """Move a directory into scratch_dir and delete it on a background thread
+    (synchronously if it can't be renamed there, e.g. across filesystems)"""
+    import shutil
+    import threading
+    doomed = os.path.join(scratch_dir, f'tig-rmtmp-{os.urandom(6).hex()}')
+    try:
+        os.rename(path, doomed)
+    except OSError:
+        shutil.rmtree(path)
+        return
+    thread = threading.Thread(target=shutil.rmtree, args=(doomed,),
+                              kwargs={'ignore_errors': True}, daemon=True)
+    thread.start()
+    if not _pending_removals:
+        import atexit
+        atexit.register(_join_pending_removals)
+    _pending_removals.append(thread)
+
+def _join_pending_removals() -> None:
+    """Give background deletions a chance to finish before the interpreter exits"""
+    for thread in _pending_removals:
+        thread.join(timeout=5)
+
+def read_git_config(path: str) -> configparser.ConfigParser:
+    """Parse a git config file written by git init (INI-compatible); not for user-edited files"""
+    import configparser
+    config = configparser.ConfigParser(interpolation=None, strict=False, allow_no_value=True)
+    config.read(path)
+    return config
+
+def write_git_config(config: configparser.ConfigParser, path: str) -> None:
+    """Write a parsed git config file back in git's own layout (tab-indented keys)"""
+    with open(path, 'w') as f:
+        for section in config.sections():
+            f.write(f'[{section}]\n')
+            for key, value in config.items(section):
+                f.write(f'\t{key}\n' if value is None else f'\t{key} = {value}\n')
+
+def find_tig_section(lines: list[str]) -> tuple[int, int] | None:
+    """Line range [header, next section) of the [submodule ".tig"] section, if present"""
+    import re
+    start = next((i for i, line in enumerate(lines) if re.match(TIG_SUBMODULE_HEADER, line)), None)
+    if start is None:
+        return None
+    end = next((i for i in range(start + 1, len(lines)) if re.match(SECTION_HEADER, lines[i])), len(lines))
+    return start, end
+
+def read_lines(path: str) -> list[str]:
+    """A text file's lines with their endings; empty if it doesn't exist"""
+    try:
+        with open(path, 'r') as f:
+            return f.readlines()
+    except FileNotFoundError:
+        return []
+
+def set_tig_submodule_keys(path: str, values: dict[str, str]) -> None:
+    """Set keys in .gitmodules' [submodule ".tig"] section (appended if missing), touching no other line"""
+    import re
+    lines = read_lines(path)
+    section = find_tig_section(lines)
+    if section is None:
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+        lines.append(f'[{TIG_SUBMODULE_SECTION}]\n')
+        section = (len(lines) - 1, len(lines))
+    start, end = section
+    
+    for key, value in values.items():
+        entry = f'\t{key} = {value}\n'
+        existing = next((i for i in range(start + 1, end)
+                         if re.match(rf'\s*{re.escape(key)}\s*(=|$)', lines[i], re.IGNORECASE)), None)
+        if existing is not None:
+            lines[existing] = entry
+            continue
+        # New keys go after the section's last non-blank line
+        insert_at = end
+        while insert_at > start + 1 and not lines[insert_at - 1].strip():
+            insert_at -= 1
+        lines.insert(insert_at, entry)
+        end += 1
+    
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+def remove_tig_submodule_section(path: str) -> None:
+    """Drop the [submodule ".tig"] section from .gitmodules, deleting the file if nothing else is left"""
+    lines = read_lines(path)
+    section = find_tig_section(lines)
+    if section is None:
+        return
+    del lines[section[0]:section[1]]
+    if any(line.strip() for line in lines):
+        with open(path, 'w') as f:
+            f.writelines(lines)
+    else:
+        os.remove(path)
+
+def format_ident(signature: pygit2.Signature) -> str:
+    """Format a pygit2 Signature as a commit header identity: `Name <email> time +hhmm`"""
+    sign = '-' if signature.offset < 0 else '+'
+    hours, minutes = divmod(abs(signature.offset), 60)
+    return f'{signature.name} <{signature.email}> {signature.time} {sign}{hours:02d}{minutes:02d}'
+
+def write_initial_pack(git_dir: str, files: dict[str, bytes], author: str, committer: str,
+                       message: str) -> str:
+    """Write a root commit of the given top-level files as a single pack + .idx; return its SHA"""
+    import hashlib
+    import struct
+    import zlib
+    
+    objects = []
+    def add(kind: str, content: bytes) -> bytes:
+        sha = hashlib.sha1(b'%s %d\0' % (kind.encode(), len(content)) + content).digest()
+        objects.append((sha, kind, content))
+        return sha
+    
+    tree = b''.join(b'100644 %s\0' % name.encode() + add('blob', data)
+                    for name, data in sorted(files.items()))
+    tree_sha = add('tree', tree)
+    commit_sha = add('commit', (f'tree {tree_sha.hex()}\nauthor {author}\n'
+                                f'committer {committer}\n\n{message}\n').encode())
+    
+    # Pack v2: header, then per object a type/size varint and the deflated content, then SHA-1 trailer
+    pack = bytearray(b'PACK' + struct.pack('>II', 2, len(objects)))
+    entries = {}  # sha -> (crc32 of the packed entry, offset in pack)
+    for sha, kind, content in objects:
+        size = len(content)
+        header = [(PACK_OBJECT_TYPES[kind] << 4) | (size & 0x0f)]
+        size >>= 4
+        while size:
+            header[-1] |= 0x80
+            header.append(size & 0x7f)
+            size >>= 7
+        entry = bytes(header) + zlib.compress(content)
+        entries[sha] = (zlib.crc32(entry), len(pack))
+        pack += entry
+    pack_checksum = hashlib.sha1(pack).digest()
+    pack += pack_checksum
+    
+    # Index v2: fan-out table, sorted names, CRCs, offsets, pack checksum, own checksum
+    shas = sorted(entries)
+    index = bytearray(b'\377tOc' + struct.pack('>I', 2))
+    index += struct.pack('>256I', *(sum(1 for sha in shas if sha[0] <= i) for i in range(256)))
+    index += b''.join(shas)
+    index += b''.join(struct.pack('>I', entries[sha][0]) for sha in shas)
+    index += b''.join(struct.pack('>I', entries[sha][1]) for sha in shas)
+    index += pack_checksum
+    index += hashlib.sha1(index).digest()
+    
+    pack_path = os.path.join(git_dir, 'objects', 'pack', f'pack-{pack_checksum.hex()}')
+    os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+    with open(f'{pack_path}.pack', 'wb') as f:
+        f.write(pack)
+    with open(f'{pack_path}.idx', 'wb') as f:
+        f.write(index)
+    return commit_sha.hex()
+
+def link_tree(src: str, dst: str, skip: tuple[str, ...] = ()) -> None:
+    """Mirror src into dst with hardlinks, copying files that can't be linked (e.g. across filesystems)"""
+    os.makedirs(dst, exist_ok=True)
+    with os.scandir(src) as entries:
+        for entry in entries:
+            if entry.name in skip:
+                continue
+            target = os.path.join(dst, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                link_tree(entry.path, target)
+                continue
+            try:
+                os.link(entry.path, target)
+            except OSError:
+                fast_copy(entry.path, target)
+
+def fast_copy(src: str, dst: str) -> None:
+    """Copy a file's contents and mode in the kernel (copy_file_range, then sendfile), else in userspace"""
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        st = os.fstat(src_fd)
+        os.fchmod(dst_fd, st.st_mode & 0o7777)
+        
+        # Explicit source offsets leave both file objects' positions untouched for the fallback
+        for kernel_copy in ('copy_file_range', 'sendfile'):
+            if not hasattr(os, kernel_copy):
+                continue
+            offset = 0
+            try:
+                while offset < st.st_size:
+                    if kernel_copy == 'copy_file_range':
+                        copied = os.copy_file_range(src_fd, dst_fd, st.st_size - offset, offset, offset)
+                    else:
+                        copied = os.sendfile(dst_fd, src_fd, offset, st.st_size - offset)
+                    if not copied:
+                        break
+                    offset += copied
+                return
+            except OSError:
+                # Unsupported for this pair of files; start over with the next method
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                os.ftruncate(dst_fd, 0)
+        
+        import shutil
+        shutil.copyfileobj(fsrc, fdst)
 
 class TigSubmoduleManager:
     """Manages .tig as a git submodule for clean PR history and branch following"""
     
-    def __init__(self, project_dir: str = None):
-        self.project_dir = project_dir or os.getcwd()
-        self.tig_dir = os.path.join(self.project_dir, '.tig')
-        self.tig_remote_dir = os.path.join(self.project_dir, '.tig-remote.git')
+    def __init__(self, project_dir: str | None = None):
+        self.project_dir: str = project_dir or os.getcwd()
+        self.tig_dir: str = os.path.join(self.project_dir, '.tig')
+        self.tig_remote_dir: str = os.path.join(self.project_dir, '.tig-remote.git')
+        self.gitmodules_path: str = os.path.join(self.project_dir, '.gitmodules')
+        # Resolved once per manager instead of re-running the checks
+        self._git_dir: str | None = None
+        # What this run created, so a failed setup never removes anything that was already there
+        # (an existing .git/modules/.tig may hold the only copy of the context history)
+        self._created_dirs: list[str] = []
+        self._registered_submodule: bool = False
     
-    def setup_tig_submodule(self):
+    def setup_tig_submodule(self) -> bool:
         """
         Set up .tig as a git submodule with local bare repository as remote
         This enables branch following and clean PR history
         """
-        print("🔧 Setting up Tig submodule for git-native branching...")
+        status("🔧 Setting up Tig submodule for git-native branching...")
         
         # Check if we're in a git repository
         if not self._is_git_repo():
@@ -39,7 +338,7 @@ class TigSubmoduleManager:
         
         # Case 2: .tig exists and is already a submodule - do nothing
         if self._is_submodule_setup():
-            print("✅ Tig submodule already configured")
+            status("✅ Tig submodule already configured")
             return True
         
         # Case 3: .tig exists as something else - user needs to clean up
@@ -48,31 +347,28 @@ class TigSubmoduleManager:
         print("   Then run setup again")
         return False
     
-    def _create_submodule_from_scratch(self):
+    def _create_submodule_from_scratch(self) -> bool:
         """Create submodule when no .tig exists (clean path - no backup needed)"""
-        print("📦 Creating fresh Tig submodule...")
+        status("📦 Creating fresh Tig submodule...")
         
+        from concurrent.futures import ThreadPoolExecutor
         try:
-            # Step 1: Create bare repository
-            self._create_bare_remote()
-            
-            # Step 2: Create empty initial commit in bare repo
-            self._create_initial_commit()
-            
-            # Step 3: Add as submodule (no existing directory to conflict)
-            subprocess.run(['git', 'submodule', 'add', self.tig_remote_dir, '.tig'], 
-                          cwd=self.project_dir, check=True)
-            
-            # Step 4: Initialize basic Tig structure in submodule
-            self._initialize_tig_structure()
-            
-            # Step 5: Configure branch following
-            self._configure_branch_following()
-            
-            # Step 6: Update .gitignore
-            self._update_gitignore()
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # Step 1: Update .gitignore in the background; nothing else depends on it
+                gitignore_update = executor.submit(self._update_gitignore)
+                
+                # Steps 2-4: Create bare remote with an initial commit and add it as submodule
+                self._create_remote_and_submodule()
+                
+                # Step 5: Initialize basic Tig structure in submodule
+                self._initialize_tig_structure()
+                
+                # Step 6: Configure branch following
+                self._configure_branch_following()
+                
+                gitignore_update.result()
             
-            print("✅ Fresh Tig submodule created successfully!")
+            status("✅ Fresh Tig submodule created successfully!")
             return True
             
         except Exception as e:
@@ -84,221 +380,281 @@ class TigSubmoduleManager:
     
     def _is_git_repo(self) -> bool:
         """Check if current directory is a git repository"""
-        try:
-            subprocess.run(['git', 'rev-parse', '--git-dir'], 
-                         cwd=self.project_dir, capture_output=True, check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return bool(self._get_git_dir())
+    
+    def _get_git_dir(self) -> str:
+        """Absolute path of the repository's common git directory, or '' outside a repository (cached)"""
+        if self._git_dir is None:
+            pygit2 = import_pygit2()
+            if pygit2 is not None:
+                git_dir = pygit2.discover_repository(self.project_dir) or ''
+                # Linked worktrees point at the shared git directory through a commondir file
+                if git_dir and os.path.exists(os.path.join(git_dir, 'commondir')):
+                    with open(os.path.join(git_dir, 'commondir'), 'r') as f:
+                        git_dir = os.path.join(git_dir, f.read().strip())
+            else:
+                result = run_git('rev-parse', '--git-common-dir', 
+                               cwd=self.project_dir, capture_output=True, text=True)
+                git_dir = result.stdout.strip() if result.returncode == 0 else ''
+            self._git_dir = os.path.normpath(os.path.join(self.project_dir, git_dir)) if git_dir else ''
+        return self._git_dir
     
     def _is_submodule_setup(self) -> bool:
         """Check if .tig is already configured as a submodule"""
-        gitmodules_path = os.path.join(self.project_dir, '.gitmodules')
-        if os.path.exists(gitmodules_path):
-            with open(gitmodules_path, 'r') as f:
-                content = f.read()
-                return 'path = .tig' in content
-        return False
+        return find_tig_section(read_lines(self.gitmodules_path)) is not None
+    
+    def _get_module_dir(self) -> str:
+        """Git directory of the .tig submodule, inside the superproject's git directory"""
+        return os.path.join(self._get_git_dir(), 'modules', '.tig')
     
-    def _create_bare_remote(self):
-        """Create bare repository to serve as submodule remote"""
-        print("📦 Creating bare repository for submodule remote...")
+    def _create_remote_and_submodule(self) -> None:
+        """Create the bare remote, commit config.json to it and add it as the .tig submodule"""
+        status("📦 Creating bare repository and submodule...")
+        
+        import shutil
+        import tempfile
         
-        # Remove existing bare remote if it exists
+        # Like `git submodule add`, refuse to reuse an existing submodule git directory
+        # (checked before anything, including its origin remote, is touched)
+        module_dir = self._get_module_dir()
+        if os.path.exists(module_dir):
+            raise RuntimeError(f"A git directory for '.tig' already exists: {module_dir} "
+                               "(it may hold unpushed context history; move it aside to start over)")
+        
+        # Remove existing bare remote if it exists (deleted in the background from inside
+        # the git directory, so an unfinished deletion never shows up in the work tree)
         if os.path.exists(self.tig_remote_dir):
-            shutil.rmtree(self.tig_remote_dir)
+            remove_dir_async(self.tig_remote_dir, self._get_git_dir())
         
-        # Create bare repository
-        subprocess.run(['git', 'init', '--bare', self.tig_remote_dir], check=True)
-        print(f"✅ Bare repository created: {self.tig_remote_dir}")
+        # Build the remote in the temp directory and move it into place once its ref exists
+        build_dir = tempfile.mkdtemp(prefix='tig-remote-')
+        try:
+            commit = self._create_bare_remote(build_dir)
+            shutil.move(build_dir, self.tig_remote_dir)
+            self._created_dirs.append(self.tig_remote_dir)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        
+        status(f"✅ Bare repository created: {self.tig_remote_dir}")
+        
+        self._add_submodule(commit)
+        status("✅ Submodule added")
     
-    def _create_initial_commit(self):
-        """Create initial empty commit in bare repository"""
-        print("📝 Creating initial commit in bare repository...")
+    def _add_submodule(self, commit: str) -> None:
+        """Add the bare remote as the .tig submodule without the clone `git submodule add` would run"""
+        module_dir = self._get_module_dir()
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Clone bare repo to temp directory
-            subprocess.run(['git', 'clone', self.tig_remote_dir, temp_dir], check=True)
-            
-            # Create minimal initial structure
-            with open(os.path.join(temp_dir, 'config.json'), 'w') as f:
-                json.dump({'version': '1.0', 'type': 'tig-context'}, f, indent=2)
-            
-            # Create initial commit
-            subprocess.run(['git', 'add', '.'], cwd=temp_dir, check=True)
-            subprocess.run(['git', 'commit', '-m', 'tig: Initialize context repository'], 
-                         cwd=temp_dir, check=True)
-            subprocess.run(['git', 'push', 'origin', 'main'], cwd=temp_dir, check=True)
+        # Submodule git directory: share the remote's (immutable) objects, write the few refs directly
+        os.makedirs(module_dir)
+        self._created_dirs.append(module_dir)
+        link_tree(os.path.join(self.tig_remote_dir, 'objects'), os.path.join(module_dir, 'objects'))
+        refs = {
+            'HEAD': 'ref: refs/heads/main',
+            'refs/heads/main': commit,
+            'refs/remotes/origin/main': commit,
+            'refs/remotes/origin/HEAD': 'ref: refs/remotes/origin/main',
+        }
+        for name, value in refs.items():
+            ref_path = os.path.join(module_dir, name)
+            os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+            with open(ref_path, 'w') as f:
+                f.write(f'{value}\n')
+        
+        # Same settings a clone would record, starting from the remote's probed core settings
+        config = read_git_config(os.path.join(self.tig_remote_dir, 'config'))
+        config['core']['bare'] = 'false'
+        config['core']['logallrefupdates'] = 'true'
+        config['core']['worktree'] = os.path.relpath(self.tig_dir, module_dir)
+        config['remote "origin"'] = {'url': self.tig_remote_dir,
+                                     'fetch': '+refs/heads/*:refs/remotes/origin/*'}
+        config['branch "main"'] = {'remote': 'origin', 'merge': 'refs/heads/main'}
+        write_git_config(config, os.path.join(module_dir, 'config'))
+        
+        # Work tree with a gitfile pointing at the module directory
+        os.makedirs(self.tig_dir)
+        self._created_dirs.append(self.tig_dir)
+        with open(os.path.join(self.tig_dir, '.git'), 'w') as f:
+            f.write(f'gitdir: {os.path.relpath(module_dir, self.tig_dir)}\n')
+        
+        self._registered_submodule = not self._is_submodule_setup()
+        set_tig_submodule_keys(self.gitmodules_path, {'path': '.tig', 'url': self.tig_remote_dir})
+        
+        pygit2 = import_pygit2()
+        if pygit2 is not None:
+            pygit2.Repository(self.tig_dir).checkout_head(strategy=pygit2.enums.CheckoutStrategy.FORCE)
             
-            print("✅ Initial commit created in bare repository")
+            repo = pygit2.Repository(self.project_dir)
+            repo.config['submodule..tig.url'] = self.tig_remote_dir
+            repo.config['submodule..tig.active'] = True
+            index = repo.index
+            index.add(pygit2.IndexEntry('.tig', pygit2.Oid(hex=commit), pygit2.enums.FileMode.COMMIT))
+            index.add('.gitmodules')
+            index.write()
+        else:
+            run_script(REGISTER_SUBMODULE_SCRIPT, self.tig_dir, self.project_dir,
+                       self.tig_remote_dir, commit, check=True)
     
-    def _initialize_tig_structure(self):
+    def _create_bare_remote(self, path: str) -> str:
+        """Create a bare repository at path with config.json committed to main; return the commit SHA"""
+        pygit2 = import_pygit2()
+        if pygit2 is not None:
+            signature = pygit2.init_repository(path, bare=True, initial_head='main').default_signature
+            author = committer = format_ident(signature)
+        else:
+            import subprocess
+            result = run_script(INIT_REMOTE_SCRIPT, path, stdout=subprocess.PIPE, text=True, check=True)
+            author, committer = result.stdout.splitlines()
+        
+        # The initial objects go straight into one pack instead of three loose objects
+        commit = write_initial_pack(path, {'config.json': CONFIG_JSON}, author, committer,
+                                    'tig: Initialize context repository')
+        with open(os.path.join(path, 'refs', 'heads', 'main'), 'w') as f:
+            f.write(f'{commit}\n')
+        return commit
+    
+    def _initialize_tig_structure(self) -> None:
         """Initialize basic Tig structure in the new submodule"""
-        print("📁 Initializing Tig structure in submodule...")
+        status("📁 Initializing Tig structure in submodule...")
         
         # Create basic structure
         os.makedirs(os.path.join(self.tig_dir, 'cache'), exist_ok=True)
         os.makedirs(os.path.join(self.tig_dir, 'shadow'), exist_ok=True)
         
-        # Create .gitignore to exclude session_state.json
-        gitignore_path = os.path.join(self.tig_dir, '.gitignore')
-        with open(gitignore_path, 'w') as f:
-            f.write('session_state.json\n')
-        
-        # Create micro_index.json
-        micro_index = {
-            'conversations': {},
-            'snapshots': {},
-            'last_conversation_id': 0,
-            'last_snapshot_id': 0,
-            'file_index': {}
-        }
+        # Create .gitignore to exclude per-session files and the blob store
+        with open(os.path.join(self.tig_dir, '.gitignore'), 'wb') as f:
+            f.write(TIG_GITIGNORE)
         
-        micro_index_path = os.path.join(self.tig_dir, 'micro_index.json')
-        with open(micro_index_path, 'w') as f:
-            json.dump(micro_index, f, indent=2)
+        # Create index counters (snapshots and conversations are appended as JSONL)
+        index_dir = os.path.join(self.tig_dir, 'index')
+        os.makedirs(index_dir, exist_ok=True)
+        with open(os.path.join(index_dir, 'counters.json'), 'wb') as f:
+            f.write(COUNTERS_JSON)
         
-        print("✅ Tig structure initialized")
+        status("✅ Tig structure initialized")
     
-    def _populate_bare_remote(self):
+    def _populate_bare_remote(self) -> None:
         """Initialize bare remote with existing .tig content"""
-        print("📁 Populating bare remote with existing .tig content...")
+        status("📁 Populating bare remote with existing .tig content...")
+        import tempfile
         
         # Create temporary directory for initial commit
         with tempfile.TemporaryDirectory() as temp_dir:
             # Clone the bare repo to temp directory
-            subprocess.run(['git', 'clone', self.tig_remote_dir, temp_dir], check=True)
+            run_git('clone', self.tig_remote_dir, temp_dir, check=True)
             
-            # Copy existing .tig content (excluding .git directory)
+            # Link existing .tig content (excluding .git directory); git only reads it
             if os.path.exists(self.tig_dir):
-                for item in os.listdir(self.tig_dir):
-                    if item == '.git':
-                        continue  # Skip existing .git directory
-                    
-                    src = os.path.join(self.tig_dir, item)
-                    dst = os.path.join(temp_dir, item)
-                    
-                    if os.path.isdir(src):
-                        shutil.copytree(src, dst)
-                    else:
-                        shutil.copy2(src, dst)
+                link_tree(self.tig_dir, temp_dir, skip=('.git',))
             
             # Create initial commit in temp repo
-            subprocess.run(['git', 'add', '.'], cwd=temp_dir, check=True)
+            run_git('add', '.', cwd=temp_dir, check=True)
             
             # Check if there's anything to commit
-            result = subprocess.run(['git', 'diff', '--cached', '--quiet'], 
-                                  cwd=temp_dir, capture_output=True)
+            result = run_git('diff', '--cached', '--quiet', cwd=temp_dir, capture_output=True)
             
             if result.returncode != 0:  # There are changes to commit
-                subprocess.run(['git', 'commit', '-m', 'tig: Initial context import'], 
-                             cwd=temp_dir, check=True)
-                subprocess.run(['git', 'push', 'origin', 'main'], 
-                             cwd=temp_dir, check=True)
-                print("✅ Initial content committed to bare remote")
+                run_git('commit', '-m', 'tig: Initial context import', cwd=temp_dir, check=True)
+                run_git('push', 'origin', 'main', cwd=temp_dir, check=True)
+                status("✅ Initial content committed to bare remote")
             else:
-                print("ℹ️  No existing content to import")
+                status("ℹ️  No existing content to import")
     
     # Old _add_submodule method removed - destructive backup logic eliminated
     # Only supporting fresh submodule creation via _create_submodule_from_scratch
     
-    def _configure_branch_following(self):
+    def _configure_branch_following(self) -> None:
         """Configure submodule to follow main repository branches"""
-        print("🌿 Configuring branch following...")
-        
-        # Set submodule to follow the current branch
-        subprocess.run(['git', 'config', '-f', '.gitmodules', 
-                       'submodule..tig.branch', '.'], 
-                      cwd=self.project_dir, check=True)
+        status("🌿 Configuring branch following...")
         
-        # Update submodule configuration
-        subprocess.run(['git', 'submodule', 'sync'], cwd=self.project_dir, check=True)
+        # Set submodule to follow the current branch; written directly instead of `git config -f`
+        set_tig_submodule_keys(self.gitmodules_path, {'branch': '.'})
         
-        print("✅ Branch following configured")
+        status("✅ Branch following configured")
     
-    def _update_gitignore(self):
+    def _update_gitignore(self) -> None:
         """Update .gitignore to exclude bare repository and backup files"""
         gitignore_path = os.path.join(self.project_dir, '.gitignore')
         
         entries_to_add = [
-            ".tig-remote.git/",
-            ".tig.backup/"
+            b".tig-remote.git/",
+            b".tig.backup/"
         ]
         
-        existing_entries = set()
-        if os.path.exists(gitignore_path):
-            with open(gitignore_path, 'r') as f:
-                existing_entries = set(line.strip() for line in f if line.strip())
-        
-        new_entries = [entry for entry in entries_to_add if entry not in existing_entries]
+        # One descriptor for both the read and the append; O_APPEND keeps the write
+        # atomic with respect to other writers
+        fd = os.open(gitignore_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            content = os.read(fd, os.fstat(fd).st_size)
+            existing_entries = {line.strip() for line in content.splitlines()}
+            new_entries = [entry for entry in entries_to_add if entry not in existing_entries]
+            
+            if new_entries:
+                block = b'# Tig submodule files\n' + b''.join(entry + b'\n' for entry in new_entries)
+                if content.strip():  # Add newline if file has content
+                    block = b'\n' + block
+                os.write(fd, block)
+        finally:
+            os.close(fd)
         
         if new_entries:
-            with open(gitignore_path, 'a') as f:
-                if existing_entries:  # Add newline if file exists
-                    f.write('\n')
-                f.write('# Tig submodule files\n')
-                for entry in new_entries:
-                    f.write(f'{entry}\n')
-            print("✅ Updated .gitignore for submodule files")
+            status("✅ Updated .gitignore for submodule files")
     
-    def _cleanup_failed_setup(self):
+    def _cleanup_failed_setup(self) -> None:
         """Clean up if submodule setup fails"""
-        print("🧹 Cleaning up failed setup...")
+        status("🧹 Cleaning up failed setup...")
         
-        # Remove bare remote
-        if os.path.exists(self.tig_remote_dir):
-            shutil.rmtree(self.tig_remote_dir)
+        # Remove only what this run created: the work tree, submodule git directory and bare remote
+        for path in reversed(self._created_dirs):
+            if os.path.exists(path):
+                remove_dir_async(path, self._get_git_dir())
         
-        # Remove .gitmodules entry if it exists
-        gitmodules_path = os.path.join(self.project_dir, '.gitmodules')
-        if os.path.exists(gitmodules_path):
+        # Remove the .tig entry from .gitmodules if this run added it, keeping any other submodules
+        if self._registered_submodule and os.path.exists(self.gitmodules_path):
             try:
-                subprocess.run(['git', 'rm', '--cached', '.tig'], 
-                             cwd=self.project_dir, capture_output=True)
-                os.remove(gitmodules_path)
+                run_git('rm', '--cached', '.tig', cwd=self.project_dir, capture_output=True)
+                remove_tig_submodule_section(self.gitmodules_path)
             except:
                 pass
         
         # Restore backup if it exists
         backup_dir = f"{self.tig_dir}.backup"
         if os.path.exists(backup_dir):
+            import shutil
             if os.path.exists(self.tig_dir):
-                shutil.rmtree(self.tig_dir)
+                remove_dir_async(self.tig_dir, self._get_git_dir())
             shutil.move(backup_dir, self.tig_dir)
     
-    def update_submodule_after_conversation(self, ai_files: list):
+    def update_submodule_after_conversation(self, ai_files: list[str]) -> bool:
         """
         Update submodule after AI conversation
         This creates the clean commit structure described in the design doc
         """
-        print("📝 Updating submodule after conversation...")
+        status("📝 Updating submodule after conversation...")
         
         try:
-            # Step 1: Commit AI-modified files to main repository
-            for file_path in ai_files:
-                subprocess.run(['git', 'add', file_path], cwd=self.project_dir, check=True)
+            # Step 1: Stage AI-modified files in main repository, one git add per batch
+            for i in range(0, len(ai_files), GIT_ADD_BATCH_SIZE):
+                run_git('add', '--', *ai_files[i:i + GIT_ADD_BATCH_SIZE], 
+                        cwd=self.project_dir, check=True)
             
             # Step 2: Commit submodule changes
-            subprocess.run(['git', 'add', '.'], cwd=self.tig_dir, check=True)
+            run_git('add', '.', cwd=self.tig_dir, check=True)
             
             # Check if there are changes to commit in submodule
-            result = subprocess.run(['git', 'diff', '--cached', '--quiet'], 
-                                  cwd=self.tig_dir, capture_output=True)
+            result = run_git('diff', '--cached', '--quiet', cwd=self.tig_dir, capture_output=True)
             
             if result.returncode != 0:  # There are changes
-                subprocess.run(['git', 'commit', '-m', 'tig: Update conversation context'], 
-                             cwd=self.tig_dir, check=True)
+                run_git('commit', '-m', 'tig: Update conversation context', cwd=self.tig_dir, check=True)
                 
                 # Step 3: Combined commit: AI files + submodule reference
-                subprocess.run(['git', 'add', '.tig'], cwd=self.project_dir, check=True)
+                run_git('add', '.tig', cwd=self.project_dir, check=True)
                 
                 commit_msg = f'feat: AI-assisted changes ({len(ai_files)} files + context)'
-                subprocess.run(['git', 'commit', '-m', commit_msg], 
-                             cwd=self.project_dir, check=True)
+                run_git('commit', '-m', commit_msg, cwd=self.project_dir, check=True)
                 
-                print(f"✅ Created clean commit: {len(ai_files)} files + context")
+                status(f"✅ Created clean commit: {len(ai_files)} files + context")
             else:
-                print("ℹ️  No context changes to commit")
+                status("ℹ️  No context changes to commit")
                 
         except Exception as e:
             print(f"❌ Failed to update submodule: {e}")
@@ -306,15 +662,17 @@ class TigSubmoduleManager:
         
         return True
 
-def main():
+def main() -> None:
     """Command line interface for submodule setup"""
+    global QUIET
     if len(sys.argv) > 1 and sys.argv[1] == '--help':
         print("""
 Tig Submodule Setup
 
 Usage:
-  tig_submodule_setup.py         # Set up .tig as submodule
-  tig_submodule_setup.py --help  # Show this help
+  tig_submodule_setup.py          # Set up .tig as submodule
+  tig_submodule_setup.py --quiet  # Same, printing only errors (or set TIG_QUIET=1)
+  tig_submodule_setup.py --help   # Show this help
 
 This enables:
 - Git-native branching (context follows branches)
@@ -323,8 +681,17 @@ This enables:
 """)
         return
     
-    manager = TigSubmoduleManager()
-    success = manager.setup_tig_submodule()
+    if '--quiet' in sys.argv[1:]:
+        QUIET = True
+    
+    # Block-buffer status output even on a terminal and flush it once at the end
+    if isinstance(sys.stdout, io.TextIOWrapper):
+        sys.stdout.reconfigure(line_buffering=False)
+    try:
+        manager = TigSubmoduleManager()
+        success = manager.setup_tig_submodule()
+    finally:
+        sys.stdout.flush()
     sys.exit(0 if success else 1)
 
 if __name__ == '__main__':
@@ -80,12 +80,14 @@ class TigSync {
     if (specificFiles && specificFiles.length) {
       filesToCheck = specificFiles.slice();
     } else {
-      // Collect files tracked in .tig (excluding .git, cache, shadow and metadata files)
-      const tigFiles = readDirRecursive(this.tigDir, (name, full) => !['.git', 'cache', 'shadow'].includes(name));
+      // Collect files tracked in .tig (excluding .git, cache, shadow, index and metadata files)
+      const indexDir = path.join(this.tigDir, 'index');
+      const objectsDir = path.join(this.tigDir, 'objects');
+      const tigFiles = readDirRecursive(this.tigDir, (name, full) => !['.git', 'cache', 'shadow'].includes(name) && full !== indexDir && full !== objectsDir);
       for (const f of tigFiles) {
         const rp = rel(this.tigDir, f);
         const base = path.basename(rp);
-        if (['micro_index.json', 'session_state.json', 'config.json', '.git', '.gitignore'].includes(base)) continue;
+        if (['micro_index.json', 'session_state.json', 'events.jsonl', 'messages.jsonl', 'config.json', '.git', '.gitignore'].includes(base)) continue;
         filesToCheck.push(rp);
       }
 
@@ -139,6 +141,8 @@ class TigSync {
         return true;
       }
       fs.mkdirSync(path.dirname(tigPath), { recursive: true });
+      // The .tig copy may be a hardlink into .tig/objects; never write through it
+      if (exists(tigPath)) fs.unlinkSync(tigPath);
       fs.copyFileSync(mainPath, tigPath);
       if (this.verbose) console.log(`  ✓ Synced: ${rp}`);
       return true;